@@ -38,3 +38,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     token = credentials.credentials
     payload = decode_jwt_token(token)
     return payload.get("sub")
+
+# comma separated list of emails allowed to call the /admin endpoints
+ADMIN_EMAILS = {email.strip() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+async def get_admin_user(token: str = Depends(get_current_user)) -> str:
+    if token not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return token
@@ -0,0 +1,75 @@
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# Throughput and latency of concurrent Mongo-bound reads against a running server
+# (`python main.py`, one uvicorn worker) and a local mongod; no results are kept in
+# the repo, the numbers depend on the machine and the database:
+#   python benchmarks/load_test.py --url http://localhost:8000 --concurrency 200
+ENDPOINTS = ["/api/notes", "/api/expenses", "/api/transactions", "/api/user_stocks", "/api/profile"]
+NOW = "2024-01-01T00:00:00"
+
+
+def seed(url: str, rows: int) -> dict:
+    email = "load-%s@example.com" % uuid.uuid4().hex[:8]
+    requests.post(url + "/api/signup", json={"email": email, "password": "load-test"}).raise_for_status()
+    token = requests.post(url + "/api/signin", json={"email": email, "password": "load-test"}).json()["access_token"]
+    headers = {"Authorization": "Bearer " + token}
+    for i in range(rows):
+        requests.post(
+            url + "/api/notes",
+            headers=headers,
+            json={"title": "note %d" % i, "content": "x" * 200, "created_at": NOW, "last_modified": NOW},
+        ).raise_for_status()
+        requests.post(url + "/api/expenses", headers=headers, json={"amount": i}).raise_for_status()
+        requests.post(url + "/api/transactions", headers=headers, json={"amount": i}).raise_for_status()
+    return headers
+
+
+def run(url: str, headers: dict, concurrency: int, duration: float) -> None:
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset: int) -> None:
+        nonlocal errors
+        session = requests.Session()
+        session.headers.update(headers)
+        i = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = session.get(url + ENDPOINTS[i % len(ENDPOINTS)])
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += response.status_code >= 400
+            i += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    took = time.monotonic() - started
+    latencies.sort()
+    print(f"requests     {len(latencies)} ({errors} errors) in {took:.1f}s")
+    print(f"throughput   {len(latencies) / took:.0f} req/s")
+    print(f"latency p50  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95  {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read load against a running server")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--rows", type=int, default=50, help="notes/expenses/transactions seeded")
+    args = parser.parse_args()
+    headers = seed(args.url, args.rows)
+    run(args.url, headers, args.concurrency, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from models.model import NoteSummary
+from routes.notes import NOTE_FIELDS
+from services.fields import shape
+
+# Per-item cost of a list response, without MongoDB: the same in-memory documents
+# go through the old path (a model per document, response_model re-validation and
+# jsonable_encoder) and the current one (dict shaping rendered by orjson).
+#   python -m benchmarks.serialize_lists --items 10000
+
+
+def documents(count: int) -> List[dict]:
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "title": "note %d" % i,
+            "content": "x" * 200,
+            "tags": ["work", "todo"],
+            "folder": "Untitled",
+            "status": "in development",
+            "priority": "medium",
+            "created_at": start + timedelta(seconds=i),
+            "last_modified": start + timedelta(seconds=i),
+            "owner": "bench@example.com",
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(docs: List[dict]) -> FastAPI:
+    app = FastAPI()
+    fields = NOTE_FIELDS.allowed
+
+    @app.get("/before", response_model=List[NoteSummary], response_model_exclude_unset=True)
+    async def before():
+        return [
+            NoteSummary(id=str(doc["_id"]), **{name: doc[name] for name in fields if name in doc})
+            for doc in docs
+        ]
+
+    @app.get("/after", response_model=List[NoteSummary])
+    async def after():
+        return ORJSONResponse(shape(docs, fields))
+
+    return app
+
+
+def measure(client: TestClient, path: str, rounds: int) -> float:
+    client.get(path).raise_for_status()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        client.get(path).raise_for_status()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-item cost of list serialization")
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    docs = documents(args.items)
+    client = TestClient(build_app(docs))
+    if client.get("/before").json() != client.get("/after").json():
+        sys.exit("before and after bodies differ")
+    before = measure(client, "/before", args.rounds)
+    after = measure(client, "/after", args.rounds)
+    print(f"items        {args.items} (median of {args.rounds} requests)")
+    print(f"before       {before * 1000:.1f} ms  {before / args.items * 1e6:.2f} us/item")
+    print(f"after        {after * 1000:.1f} ms  {after / args.items * 1e6:.2f} us/item")
+    print(f"speedup      {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,39 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.collection import Collection
 import os
 from dotenv import load_dotenv
 load_dotenv()
 mongodb_url = os.getenv("MONGODB_URL")
+# request handlers await the async client; the blocking one is only used from
+# worker threads (bar cache downloads) and command line tools
 client = MongoClient(mongodb_url)
+async_client = AsyncMongoClient(mongodb_url)
 
 db = client["notes_db_1"]
-user_collection= db["users"]
-notes_collection= db["notes"]
+async_db = async_client["notes_db_1"]
+user_collection= async_db["users"]
+notes_collection= async_db["notes"]
 
-def get_expense_collection()->Collection:
-    return db["expenses"]
-def get_transaction_collection()->Collection:
-    return db["transactions"]
+def get_expense_collection()->AsyncCollection:
+    return async_db["expenses"]
+def get_transaction_collection()->AsyncCollection:
+    return async_db["transactions"]
 
-def get_current_stocks_collection()->Collection:
-    return db["current_stocks"]
+def get_current_stocks_collection()->AsyncCollection:
+    return async_db["current_stocks"]
 
-def get_purchase_collection()->Collection:
-    return db["buyed_stocks"]
+def get_purchase_collection()->AsyncCollection:
+    return async_db["buyed_stocks"]
 
-def get_sold_collection()->Collection:
-    return db["sold_stocks"]
+def get_sold_collection()->AsyncCollection:
+    return async_db["sold_stocks"]
 
 def get_stock_data_collection()->Collection:
-    return db["stock_data"]
\ No newline at end of file
+    return db["stock_data"]
+
+def get_position_snapshot_collection()->AsyncCollection:
+    return async_db["position_snapshots"]
+
+def get_trade_revision_collection()->AsyncCollection:
+    return async_db["trade_revisions"]
@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import List
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+OWNER_SYMBOL = [("owner", ASCENDING), ("symbol", ASCENDING)]
+# list pages walk (created_at, _id) either way; _id breaks created_at ties
+OWNER_CREATED = [("owner", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+
+# collection -> (keys, options); create_index is a no-op when the same index exists
+INDEXES = {
+    "users": [([("email", ASCENDING)], {"unique": True, "name": "email_unique"})],
+    "notes": [(OWNER_CREATED, {"name": "owner_created_id"})],
+    "expenses": [(OWNER_CREATED, {"name": "owner_created_id"})],
+    "transactions": [(OWNER_CREATED, {"name": "owner_created_id"})],
+    # upserts only stay single-document under concurrency with a unique (owner, symbol)
+    "current_stocks": [(OWNER_SYMBOL, {"unique": True, "name": "owner_symbol_unique"})],
+    # the ledger replays a symbol in _id order, P&L catches up on (owner, _id >= last - lag)
+    # and an import checks the owner's latest trade time
+    "buyed_stocks": [
+        (OWNER_SYMBOL + [("_id", ASCENDING)], {"name": "owner_symbol_id"}),
+        ([("owner", ASCENDING), ("_id", ASCENDING)], {"name": "owner_id"}),
+        ([("owner", ASCENDING), ("timestamp", DESCENDING)], {"name": "owner_timestamp"}),
+    ],
+    "sold_stocks": [
+        (OWNER_SYMBOL + [("_id", ASCENDING)], {"name": "owner_symbol_id"}),
+        ([("owner", ASCENDING), ("_id", ASCENDING)], {"name": "owner_id"}),
+        ([("owner", ASCENDING), ("timestamp", DESCENDING)], {"name": "owner_timestamp"}),
+    ],
+    "position_snapshots": [(OWNER_SYMBOL, {"unique": True, "name": "owner_symbol_unique"})],
+    "trade_revisions": [([("owner", ASCENDING)], {"unique": True, "name": "owner_unique"})],
+    "stock_data": [([("symbol", ASCENDING), ("interval", ASCENDING)], {"name": "symbol_interval"})],
+}
+
+_OWNER = "index-check@example.com"
+_ID = ObjectId()
+_NOW = datetime(2024, 1, 1)
+_CREATED_ASC = [("created_at", ASCENDING), ("_id", ASCENDING)]
+_CREATED_DESC = [("created_at", DESCENDING), ("_id", DESCENDING)]
+# (collection, filter, sort) for every query a route sends
+QUERY_SHAPES = [
+    ("users", {"email": _OWNER}, None),
+    ("notes", {"owner": _OWNER}, None),
+    ("notes", {"owner": _OWNER, "$or": [{"created_at": {"$gt": _NOW}}, {"created_at": _NOW, "_id": {"$gt": _ID}}]}, _CREATED_ASC),
+    ("notes", {"owner": _OWNER}, _CREATED_DESC),
+    ("notes", {"_id": _ID}, None),
+    ("expenses", {"owner": _OWNER}, None),
+    ("expenses", {"owner": _OWNER}, _CREATED_ASC),
+    ("expenses", {"_id": _ID, "owner": _OWNER}, None),
+    ("transactions", {"owner": _OWNER}, None),
+    ("transactions", {"owner": _OWNER}, _CREATED_ASC),
+    ("transactions", {"_id": _ID, "owner": _OWNER}, None),
+    ("current_stocks", {"owner": _OWNER}, None),
+    ("current_stocks", {"owner": _OWNER, "symbol": {"$gt": "TCS"}}, [("symbol", ASCENDING)]),
+    ("current_stocks", {"owner": _OWNER, "symbol": "TCS"}, None),
+    ("current_stocks", {"owner": _OWNER, "quantity": {"$gt": 0}}, None),
+    ("buyed_stocks", {"owner": _OWNER}, None),
+    ("buyed_stocks", {"owner": _OWNER, "_id": {"$lt": _ID}}, [("_id", DESCENDING)]),
+    ("buyed_stocks", {"owner": _OWNER, "symbol": "TCS"}, [("_id", DESCENDING)]),
+    ("buyed_stocks", {"owner": _OWNER, "symbol": {"$in": ["TCS"]}, "_id": {"$gt": _ID}}, None),
+    ("buyed_stocks", {"owner": _OWNER, "_id": {"$gte": _ID}}, None),
+    ("buyed_stocks", {"owner": _OWNER}, [("timestamp", DESCENDING)]),
+    ("sold_stocks", {"owner": _OWNER}, None),
+    ("sold_stocks", {"owner": _OWNER, "_id": {"$gt": _ID}}, [("_id", ASCENDING)]),
+    ("sold_stocks", {"owner": _OWNER, "symbol": "TCS"}, [("_id", DESCENDING)]),
+    ("sold_stocks", {"owner": _OWNER, "symbol": {"$in": ["TCS"]}, "_id": {"$gt": _ID}}, None),
+    ("sold_stocks", {"owner": _OWNER, "_id": {"$gte": _ID}}, None),
+    ("sold_stocks", {"owner": _OWNER}, [("timestamp", DESCENDING)]),
+    ("position_snapshots", {"owner": _OWNER, "symbol": {"$in": ["TCS"]}}, None),
+    ("trade_revisions", {"owner": _OWNER}, None),
+    ("stock_data", {"symbol": "TCS.NS", "interval": "1d"}, None),
+]
+
+
+async def ensure_indexes(database: AsyncDatabase) -> None:
+    for name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await database[name].create_index(keys, **options)
+            except PyMongoError:
+                logger.exception("Could not create index %s on %s", options["name"], name)
+                # signup and the position upserts rely on unique indexes for
+                # correctness, so existing duplicates must be cleaned up first
+                if options.get("unique"):
+                    raise
+
+
+def _stages(plan) -> List[str]:
+    # covers both the classic (inputStage/inputStages) and SBE (queryPlan) layouts
+    if isinstance(plan, dict):
+        found = [plan["stage"]] if isinstance(plan.get("stage"), str) else []
+        for value in plan.values():
+            found.extend(_stages(value))
+        return found
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _stages(item)]
+    return []
+
+
+async def check_query_plans(database: AsyncDatabase) -> List[str]:
+    # returns a description of every route query whose winning plan scans a collection
+    failures = []
+    for name, query, sort in QUERY_SHAPES:
+        cursor = database[name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _stages(plan):
+            failures.append("%s %s" % (name, query))
+    return failures
+
+
+async def _main(check: bool) -> int:
+    from database.database import async_db
+
+    await ensure_indexes(async_db)
+    if not check:
+        return 0
+    failures = await check_query_plans(async_db)
+    for failure in failures:
+        print("COLLSCAN", failure)
+    print("%d of %d query shapes use an index" % (len(QUERY_SHAPES) - len(failures), len(QUERY_SHAPES)))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the app's MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="fail if any route query does a COLLSCAN")
+    sys.exit(asyncio.run(_main(parser.parse_args().check)))
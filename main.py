@@ -2,11 +2,15 @@ from fastapi import FastAPI
 import time
 import logging
 import logging.config
+from contextlib import asynccontextmanager
 from typing import Union
+import os
 import uvicorn
 from uvicorn.config import LOGGING_CONFIG
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from routes.notes import router as notes_router
+from services.pagination import NEXT_CURSOR_HEADER
 from routes.expense import router as expense_router
 from routes.transaction import router as transaction_router
 from routes.user import router as user_router
@@ -14,13 +18,43 @@ from routes.user_stocks import router as user_stocks_router
 from routes.stock_historical_data import router as stock_historical_data
 from routes.buy_stocks import router as buy_stocks_router
 from routes.sold_stocks import router as sold_stocks_router
-app = FastAPI()
+from routes.indicators import router as indicators_router
+from routes.portfolio import router as portfolio_router
+from routes.pnl import router as pnl_router
+from routes.admin import router as admin_router
+from routes.trades import router as trades_router
+from database.database import async_db
+from database.indexes import check_query_plans, ensure_indexes
+from services.market_data import async_market_data
+from services.prewarm import PREWARM_ENABLED, prewarm_scheduler
+
+
+INDEX_CHECK = os.getenv("INDEX_CHECK", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ensure_indexes(async_db)
+    if INDEX_CHECK:
+        failures = await check_query_plans(async_db)
+        if failures:
+            raise RuntimeError("Queries without an index: %s" % "; ".join(failures))
+    if PREWARM_ENABLED:
+        prewarm_scheduler.start()
+    yield
+    await prewarm_scheduler.stop()
+    async_market_data.shutdown()
+
+
+# every JSON body is rendered by orjson unless a route picks its own response class
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],  # Allow specific origins
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER, "Link"],  # Pagination cursors
 )
 
 app.include_router(user_router, prefix="/api",tags=["User Details"])
@@ -31,6 +65,11 @@ app.include_router(user_stocks_router, prefix="/api",tags=["User Stock"])
 app.include_router(stock_historical_data, prefix="/api",tags=["Historical Stock Data"])
 app.include_router(buy_stocks_router, prefix="/api",tags=["Buy Stock"])
 app.include_router(sold_stocks_router, prefix="/api",tags=["Sell Stock"])
+app.include_router(indicators_router, prefix="/api",tags=["Indicators"])
+app.include_router(portfolio_router, prefix="/api",tags=["Portfolio"])
+app.include_router(trades_router, prefix="/api",tags=["Trades"])
+app.include_router(pnl_router, prefix="/api",tags=["Portfolio"])
+app.include_router(admin_router, prefix="/api",tags=["Admin"])
 
 def set_logging(log_file):
     # Formatter commun
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, validator
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field, validator
+from typing import List, Literal, Optional
 from datetime import datetime
 
 ################################################################
@@ -56,6 +56,20 @@ class NoteResponse(NoteInDB):
     owner: str
 
 
+class NoteSummary(BaseModel):
+    # list item; only the fields picked with `fields=` are set
+    id: str
+    title: Optional[str] = None
+    content: Optional[str] = None
+    tags: Optional[List[str]] = None
+    folder: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    created_at: Optional[datetime] = None
+    last_modified: Optional[datetime] = None
+    owner: Optional[str] = None
+
+
 ################################################################
 #                   Expense                                    #
 ################################################################
@@ -97,6 +111,18 @@ class ExpenseResponse(ExpenseBase):
         allow_population_by_field_name = True
 
 
+class ExpenseSummary(BaseModel):
+    id: str
+    amount: Optional[float] = None
+    description: Optional[str] = None
+    tags: Optional[List[str]] = None
+    split_amount: Optional[List[str]] = None
+    amount_given: Optional[bool] = None
+    status_done: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    last_modified: Optional[datetime] = None
+
+
 ################################################################
 #                   Transaction                                #
 ################################################################
@@ -139,6 +165,19 @@ class TransactionResponse(TransactionBase):
         allow_population_by_field_name = True
 
 
+class TransactionSummary(BaseModel):
+    id: str
+    amount: Optional[float] = None
+    description: Optional[str] = None
+    tags: Optional[List[str]] = None
+    transaction_type: Optional[str] = None
+    transaction_date: Optional[datetime] = None
+    status_done: Optional[bool] = None
+    second_party: Optional[str] = None
+    created_at: Optional[datetime] = None
+    last_modified: Optional[datetime] = None
+
+
 ################################################################
 #                   Stock Current                              #
 ################################################################
@@ -168,6 +207,18 @@ class CurrentStockRecordResponse(BaseModel):
         orm_mode = True
 
 
+class CurrentStockSummary(BaseModel):
+    id: str
+    symbol: Optional[str] = None
+    name: Optional[str] = None
+    price_per_unit: Optional[float] = None
+    quantity: Optional[int] = None
+    created_at: Optional[datetime] = None
+    last_updated: Optional[datetime] = None
+    net_profit: Optional[float] = None
+    owner: Optional[str] = None
+
+
 ################################################################
 #                   Stocks purchased                           #
 ################################################################
@@ -195,6 +246,17 @@ class PurchaseRecordResponse(BaseModel):
         orm_mode = True
         
 
+class PurchaseRecordSummary(BaseModel):
+    id: str
+    symbol: Optional[str] = None
+    name: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    price_per_unit: Optional[float] = None
+    quantity: Optional[int] = None
+    created_at: Optional[datetime] = None
+    last_updated: Optional[datetime] = None
+
+
 ################################################################
 #                   Stocks sold                                #
 ################################################################
@@ -221,6 +283,16 @@ class SoldRecordResponse(BaseModel):
         orm_mode = True
 
 
+class SoldRecordSummary(BaseModel):
+    id: str
+    symbol: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    price_per_unit_sold: Optional[float] = None
+    quantity: Optional[int] = None
+    created_at: Optional[datetime] = None
+    last_modified_at: Optional[datetime] = None
+
+
 
 ################################################################
 #                   Stocks purchased                           #
@@ -236,6 +308,12 @@ class StockHistory(BaseModel):
     history_last_one_day: list[dict] # historical record of last day
     created_at: datetime
     last_modified_at: datetime
+class HistoricalBatchRequest(BaseModel):
+    symbols: List[str]
+    window: Literal["day", "week", "month", "max"] = "day"
+    points: Optional[int] = Field(None, ge=3, le=10000) # downsample each series to this many bars
+
+
 class StockResponse(BaseModel):
     id: str
     symbol: str
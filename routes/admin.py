@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query
+import asyncio
+from typing import Optional
+from auth.auth import get_admin_user
+from services.ledger import PositionLedger, get_position_ledger
+
+router = APIRouter()
+
+
+@router.post("/admin/positions/verify", response_model=dict)
+async def verify_positions(
+    owner: Optional[str] = None,
+    repair: bool = False,
+    tolerance: float = Query(1e-6, ge=0),
+    admin: str = Depends(get_admin_user),
+    ledger: PositionLedger = Depends(get_position_ledger),
+):
+    # every owner with at least one trade or position when none is given
+    if owner is not None:
+        owners = [owner]
+    else:
+        found = await asyncio.gather(
+            ledger.purchases.distinct("owner"),
+            ledger.solds.distinct("owner"),
+            ledger.positions.distinct("owner"),
+        )
+        owners = sorted(set().union(*found))
+    reports = [await ledger.verify(name, repair=repair, tolerance=tolerance) for name in owners]
+    drifted = [report for report in reports if report["mismatched"] or report["orphaned"]]
+    return {
+        "owners_checked": len(reports),
+        "owners_drifted": len(drifted),
+        "repaired": sum(report["repaired"] for report in reports),
+        "reports": drifted,
+    }
@@ -1,92 +1,65 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from typing import List, Tuple
 from auth.auth import get_current_user
-from database.database import get_purchase_collection, get_current_stocks_collection
-from models.model import PurchaseRecordCreate, PurchaseRecordResponse
+from database.database import get_purchase_collection, get_current_stocks_collection, get_trade_revision_collection
+from models.model import PurchaseRecordCreate, PurchaseRecordResponse, PurchaseRecordSummary
 from bson import ObjectId
 from datetime import datetime
-from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+from services.ledger import PositionLedger, get_position_ledger
+from services.lots import PnlEngine, get_pnl_engine
+from services.fields import SparseFields
+from services.pagination import ID_KEYS, Pagination
+from services.positions import apply_buy
 
 router = APIRouter()
 
+PURCHASE_FIELDS = SparseFields(
+    ("symbol", "name", "timestamp", "price_per_unit", "quantity", "created_at", "last_updated"),
+)
+
 
 @router.post("/but_stocks", response_model=PurchaseRecordResponse)
 async def create_purchase_record(
     purchase: PurchaseRecordCreate,
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_purchase_collection),
-    current_stocks_db: Collection = Depends(get_current_stocks_collection),
+    db: AsyncCollection = Depends(get_purchase_collection),
+    current_stocks_db: AsyncCollection = Depends(get_current_stocks_collection),
 ):
     purchase_dict = purchase.dict()
     purchase_dict["created_at"] = datetime.now()
     purchase_dict["owner"] = token
     purchase_dict["last_modified"] = datetime.now()
-    result = db.insert_one(purchase_dict)
-    prev_data = current_stocks_db.find_one(
-        {"owner": token, "symbol": purchase_dict["symbol"]}
-    )
-    net_profit = float(purchase_dict["price_per_unit"]) * float(
-        purchase_dict["quantity"]
+    result = await db.insert_one(purchase_dict)
+    await apply_buy(
+        current_stocks_db,
+        token,
+        purchase_dict["symbol"],
+        purchase_dict["name"],
+        purchase_dict["quantity"],
+        purchase_dict["price_per_unit"],
     )
-    net_profit = net_profit * (-1)
-    if not prev_data:
-        current_stocks_db.insert_one(
-            {
-                "owner": token,
-                "name": purchase_dict["name"],
-                "symbol": purchase_dict["symbol"],
-                "price_per_unit": purchase_dict["price_per_unit"],
-                "quantity": purchase_dict["quantity"],
-                "created_at": purchase_dict["created_at"],
-                "last_updated": datetime.now(),
-                "net_profit": net_profit,
-            }
-        )
-    else:
-        prev_net_profit = prev_data["net_profit"] + net_profit
-        average_price_per_unit = float(
-            float(prev_data["price_per_unit"]) * float(prev_data["quantity"])
-            + float(purchase_dict["quantity"]) * float(purchase_dict["price_per_unit"])
-        )
-        total_quantity = prev_data["quantity"] + purchase_dict["quantity"]
-        average_price_per_unit = float(average_price_per_unit / total_quantity)
-        current_stocks_db.update_one(
-            {"_id": prev_data["_id"]},
-            {
-                "$set": {
-                    "quantity": total_quantity,
-                    "net_profit": prev_net_profit,
-                    "last_updated": datetime.now(),
-                    "price_per_unit": average_price_per_unit,
-                }
-            },
-        )
     return PurchaseRecordResponse(**purchase_dict, id=str(result.inserted_id))
 
 
-@router.get("/buy_stocks", response_model=List[PurchaseRecordResponse])
+@router.get("/buy_stocks", response_model=List[PurchaseRecordSummary])
 async def get_purchases(
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_purchase_collection),
+    db: AsyncCollection = Depends(get_purchase_collection),
+    page: Pagination = Depends(),
+    fields: Tuple[str, ...] = Depends(PURCHASE_FIELDS),
 ):
-    purchases = db.find({"owner": token})
-    if not purchases:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No purchases found"
-        )
-    return [
-        PurchaseRecordResponse(**purchase, id=str(purchase["_id"]))
-        for purchase in purchases
-    ]
+    # an empty page is an empty list, not a 404
+    return await page.respond(db, {"owner": token}, ID_KEYS, fields)
 
 
 @router.get("/buy_stocks/{purchase_id}", response_model=PurchaseRecordResponse)
 async def get_purchase(
     purchase_id: str,
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_purchase_collection),
+    db: AsyncCollection = Depends(get_purchase_collection),
 ):
-    purchases = db.find_one({"owner": token, "_id": ObjectId(purchase_id)})
+    purchases = await db.find_one({"owner": token, "_id": ObjectId(purchase_id)})
     if not purchases:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No purchases found"
@@ -99,66 +72,32 @@ async def update_buy_record(
     purchase_id: str,
     updated_data: PurchaseRecordCreate,
     token: str = Depends(get_current_user),
-    purchases_collection: Collection = Depends(get_purchase_collection),
-    current_stock_collection: Collection = Depends(get_current_stocks_collection),
+    purchases_collection: AsyncCollection = Depends(get_purchase_collection),
+    ledger: PositionLedger = Depends(get_position_ledger),
+    pnl: PnlEngine = Depends(get_pnl_engine),
+    revisions: AsyncCollection = Depends(get_trade_revision_collection),
 ):
-    existing_purchase = purchases_collection.find_one(
+    existing_purchase = await purchases_collection.find_one(
         {"_id": ObjectId(purchase_id), "owner": token}
     )
     if not existing_purchase:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No purchases found"
         )
-    prev_data = current_stock_collection.find_one(
-        {"owner": token, "symbol": existing_purchase["symbol"]}
-    )
-    # first revert the average price
-    prev_price_per_unit = (
-        prev_data["price_per_unit"] * prev_data["quantity"]
-        - existing_purchase["price_per_unit"] * existing_purchase["quantity"]
-    )
-    reverted_quantity = prev_data["quantity"] - existing_purchase["quantity"]
-    if reverted_quantity == 0:
-        average_price_per_unit = 0
-    else:
-        average_price_per_unit = float(prev_price_per_unit / reverted_quantity)
-    reverted_net_profit = prev_data["net_profit"] + (
-        existing_purchase["price_per_unit"] * existing_purchase["quantity"]
-    )
-    updated_net_profit = reverted_net_profit - (
-        updated_data.price_per_unit * updated_data.quantity
-    )
-    remaining_quantity = reverted_quantity + updated_data.quantity
-    average_price_per_unit = float(
-        average_price_per_unit * reverted_quantity
-        + float(updated_data.price_per_unit * updated_data.quantity)
-    )
-    total_quantity = reverted_quantity + updated_data.quantity
-    average_price_per_unit = float(average_price_per_unit / total_quantity)
-    current_stock_collection.update_one(
-        {"_id": ObjectId(prev_data["_id"])},
-        {
-            "$set": {
-                "symbol": updated_data.symbol,
-                "name": updated_data.name,
-                "quantity": remaining_quantity,
-                "net_profit": updated_net_profit,
-                "last_modified_at": datetime.now(),
-                "price_per_unit": average_price_per_unit,
-            }
-        },
-    )
     updated_dict = updated_data.dict(exclude_unset=True)
     updated_dict["last_modified_at"] = datetime.utcnow()
-    purchases_collection.update_one(
+    await purchases_collection.update_one(
         {"_id": ObjectId(purchase_id)}, {"$set": updated_dict}
     )
-    updated_purchase = purchases_collection.find_one({"_id": ObjectId(purchase_id)})
+    updated_purchase = await purchases_collection.find_one({"_id": ObjectId(purchase_id)})
     if not updated_purchase:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Unable to update purchase record",
         )
+    # the edited event may sit anywhere in the log, so replay instead of reverting
+    await ledger.sync(token, sorted({existing_purchase["symbol"], updated_purchase["symbol"]}))
+    await pnl.forget(token, revisions)
     return PurchaseRecordResponse(**updated_purchase, id=str(updated_purchase["_id"]))
 
 
@@ -166,47 +105,24 @@ async def update_buy_record(
 async def delete_buy_record(
     purchase_id: str,
     token: str = Depends(get_current_user),
-    purchases_collection: Collection = Depends(get_purchase_collection),
-    current_stock_collection: Collection = Depends(get_current_stocks_collection),
+    purchases_collection: AsyncCollection = Depends(get_purchase_collection),
+    ledger: PositionLedger = Depends(get_position_ledger),
+    pnl: PnlEngine = Depends(get_pnl_engine),
+    revisions: AsyncCollection = Depends(get_trade_revision_collection),
 ):
-    existing_purchase = purchases_collection.find_one(
+    existing_purchase = await purchases_collection.find_one(
         {"_id": ObjectId(purchase_id), "owner": token}
     )
     if not existing_purchase:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No purchases found"
         )
-    prev_data = current_stock_collection.find_one(
-        {"owner": token, "symbol": existing_purchase["symbol"]}
-    )
-    # first revert the average price
-    prev_price_per_unit = (
-        prev_data["price_per_unit"] * prev_data["quantity"]
-        - existing_purchase["price_per_unit"] * existing_purchase["quantity"]
-    )
-    reverted_quantity = prev_data["quantity"] - existing_purchase["quantity"]
-    if reverted_quantity == 0:
-        average_price_per_unit = 0
-    else:
-        average_price_per_unit = float(prev_price_per_unit / reverted_quantity)
-    reverted_net_profit = prev_data["net_profit"] + (
-        existing_purchase["price_per_unit"] * existing_purchase["quantity"]
-    )
-    current_stock_collection.update_one(
-        {"_id": ObjectId(prev_data["_id"])},
-        {
-            "$set": {
-                "quantity": reverted_quantity,
-                "net_profit": reverted_net_profit,
-                "last_modified_at": datetime.now(),
-                "price_per_unit": average_price_per_unit,
-            }
-        },
-    )
-    updated_purchase = purchases_collection.delete_one({"_id": ObjectId(purchase_id)})
+    updated_purchase = await purchases_collection.delete_one({"_id": ObjectId(purchase_id)})
     if not updated_purchase:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Unable to delete purchase record",
         )
+    await ledger.sync(token, [existing_purchase["symbol"]])
+    await pnl.forget(token, revisions)
     return {"message": "Purchase was successfully deleted"}
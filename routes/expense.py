@@ -1,49 +1,53 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from typing import List, Tuple
 from auth.auth import decode_jwt_token, get_current_user
 from database.database import get_expense_collection
-from models.model import ExpenseCreate, ExpenseUpdate, ExpenseResponse
+from models.model import ExpenseCreate, ExpenseUpdate, ExpenseResponse, ExpenseSummary
 from bson import ObjectId
 from datetime import datetime
-from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+from services.fields import SparseFields
+from services.pagination import CREATED_KEYS, Pagination
 
 router = APIRouter()
 
+EXPENSE_FIELDS = SparseFields(
+    ("amount", "description", "tags", "split_amount", "amount_given", "status_done", "created_at", "last_modified"),
+)
+
 
 @router.post("/expenses", response_model=ExpenseResponse)
 async def create_expense(
     expense: ExpenseCreate,
     token: str = Depends(get_current_user),
-    expense_collection: Collection = Depends(get_expense_collection),
+    expense_collection: AsyncCollection = Depends(get_expense_collection),
 ):
     expense_data = expense.dict()
     expense_data["owner"] = token
     expense_data["created_at"] = datetime.now()
     expense_data["last_modified"] = datetime.now()
-    result = expense_collection.insert_one(expense_data)
+    result = await expense_collection.insert_one(expense_data)
     return ExpenseResponse(**expense_data, id=str(result.inserted_id))
 
 
-@router.get("/expenses", response_model=List[ExpenseResponse])
+@router.get("/expenses", response_model=List[ExpenseSummary])
 async def get_expenses(
     token: str = Depends(get_current_user),
-    expense_collection: Collection = Depends(get_expense_collection),
+    expense_collection: AsyncCollection = Depends(get_expense_collection),
+    page: Pagination = Depends(),
+    fields: Tuple[str, ...] = Depends(EXPENSE_FIELDS),
 ):
-    expenses = expense_collection.find({"owner": token})
-    if not expenses:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No expenses found"
-        )
-    return [ExpenseResponse(**expense, id=str(expense["_id"])) for expense in expenses]
+    # an empty page is an empty list, not a 404
+    return await page.respond(expense_collection, {"owner": token}, CREATED_KEYS, fields)
 
 
 @router.get("/expenses/{expenses_id}", response_model=ExpenseResponse)
 async def get_expense(
     expenses_id: str,
     token: str = Depends(get_current_user),
-    expense_collection: Collection = Depends(get_expense_collection),
+    expense_collection: AsyncCollection = Depends(get_expense_collection),
 ):
-    expense = expense_collection.find_one(
+    expense = await expense_collection.find_one(
         {"_id": ObjectId(expenses_id), "owner": token}
     )
 
@@ -58,9 +62,9 @@ async def get_expense(
 async def delete_expenses(
     expenses_id: str,
     token: str = Depends(get_current_user),
-    expense_collection: Collection = Depends(get_expense_collection),
+    expense_collection: AsyncCollection = Depends(get_expense_collection),
 ):
-    expense = expense_collection.find_one(
+    expense = await expense_collection.find_one(
         {"_id": ObjectId(expenses_id), "owner": token}
     )
 
@@ -73,7 +77,7 @@ async def delete_expenses(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Expense is already done"
         )
-    expense_collection.delete_one({"_id": ObjectId(expenses_id)})
+    await expense_collection.delete_one({"_id": ObjectId(expenses_id)})
     return {"Message": "Expense deleted successfully"}
 
 
@@ -82,9 +86,9 @@ async def update_expenses(
     expenses_id: str,
     update_data: ExpenseUpdate,
     token: str = Depends(get_current_user),
-    expense_collection: Collection = Depends(get_expense_collection),
+    expense_collection: AsyncCollection = Depends(get_expense_collection),
 ):
-    expense = expense_collection.find_one(
+    expense = await expense_collection.find_one(
         {"_id": ObjectId(expenses_id), "owner": token}
     )
 
@@ -100,6 +104,6 @@ async def update_expenses(
     update_dict = update_data.dict(exclude_unset=True)
     print(update_dict)
     update_dict["last_modified"] = datetime.utcnow()
-    expense_collection.update_one({"_id": ObjectId(expenses_id)}, {"$set": update_dict})
-    update_expenses = expense_collection.find_one({"_id": ObjectId(expenses_id)})
+    await expense_collection.update_one({"_id": ObjectId(expenses_id)}, {"$set": update_dict})
+    update_expenses = await expense_collection.find_one({"_id": ObjectId(expenses_id)})
     return ExpenseResponse(**update_expenses, id=str(update_expenses["_id"]))
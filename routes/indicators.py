@@ -0,0 +1,62 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from typing import Optional
+from datetime import date
+import numpy as np
+from fastapi.responses import ORJSONResponse
+from services.bar_cache import BarCache, cached_series, get_bar_cache
+from services.coalescing import SingleFlight, get_market_data_flight
+from services.indicators import INDICATOR_PARAMS, IndicatorEngine, get_indicator_engine
+from services.market_data import AsyncMarketDataProvider, get_async_market_data, slice_bars
+from services.serializers import DAILY_DATE_FORMAT, INTRADAY_DATE_FORMAT, format_dates
+from services.symbols import get_symbol_registry
+
+router = APIRouter()
+
+DATE_FORMATS = {"1d": DAILY_DATE_FORMAT, "5m": INTRADAY_DATE_FORMAT}
+
+
+@router.get("/indicators/{symbol}", response_model=dict)
+async def get_indicator(
+    symbol: str,
+    name: str = Query(..., pattern="^(%s)$" % "|".join(INDICATOR_PARAMS)),
+    interval: str = Query("1d", pattern="^(1d|5m)$"),
+    window: Optional[int] = Query(None, ge=2, le=500),
+    fast: Optional[int] = Query(None, ge=2, le=500),
+    slow: Optional[int] = Query(None, ge=2, le=500),
+    signal: Optional[int] = Query(None, ge=2, le=500),
+    num_std: Optional[float] = Query(None, gt=0, le=10),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bar_cache: BarCache = Depends(get_bar_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    flight: SingleFlight = Depends(get_market_data_flight),
+    engine: IndicatorEngine = Depends(get_indicator_engine),
+):
+    symbol = symbol.upper()
+    symbol = symbol + ".NS"
+    if symbol not in get_symbol_registry():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Invalid stock symbol"
+        )
+    supplied = {"window": window, "fast": fast, "slow": slow, "signal": signal, "num_std": num_std}
+    params = {
+        key: supplied[key] if supplied[key] is not None else default
+        for key, default in INDICATOR_PARAMS[name].items()
+    }
+    if name == "macd" and params["fast"] >= params["slow"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="fast must be shorter than slow"
+        )
+    bars = await cached_series(symbol, interval, bar_cache, market_data, flight)
+    # always computed over the whole cached series so the memo can be extended
+    values = slice_bars(engine.get((symbol, interval), name, bars, params), start, end)
+    columns = {
+        column: np.round(values[column].to_numpy(dtype=float), 4).tolist()
+        for column in values.columns
+    }
+    dates = format_dates(values.index, DATE_FORMATS[interval]).tolist()
+    data = [
+        {"Date": day, **dict(zip(columns, row))}
+        for day, *row in zip(dates, *columns.values())
+    ]
+    return ORJSONResponse({"symbol": symbol, "indicator": name, "params": params, "data": data})
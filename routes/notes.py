@@ -1,13 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from typing import List, Tuple
 from auth.auth import decode_jwt_token, get_current_user
 from database.database import notes_collection
-from models.model import NoteCreate, NoteUpdate, NoteResponse
+from models.model import NoteCreate, NoteUpdate, NoteResponse, NoteSummary
 from bson import ObjectId
 from datetime import datetime
+from services.fields import SparseFields
+from services.pagination import CREATED_KEYS, Pagination
 
 router = APIRouter()
 
+# content is the bulk of a note, so lists leave it out unless asked for
+NOTE_FIELDS = SparseFields(
+    ("title", "content", "tags", "folder", "status", "priority", "created_at", "last_modified", "owner"),
+    ("title", "tags", "folder", "status", "priority", "created_at", "last_modified", "owner"),
+)
+
 
 @router.post("/notes", response_model=NoteResponse)
 async def create_note(note: NoteCreate, token: str = Depends(get_current_user)):
@@ -15,23 +23,23 @@ async def create_note(note: NoteCreate, token: str = Depends(get_current_user)):
     note_dict["owner"] = token
     note_dict["created_at"] = datetime.utcnow()
     note_dict["last_modified"] = datetime.utcnow()
-    result= notes_collection.insert_one(note_dict)
+    result= await notes_collection.insert_one(note_dict)
     return NoteResponse(**note_dict, id=str(result.inserted_id))
 
 
-@router.get("/notes", response_model=List[NoteResponse])
-async def get_notes(token: str = Depends(get_current_user)):
-    notes = notes_collection.find({"owner": token})
-    if not notes:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No notes found"
-        )
-    return [NoteResponse(**note, id=str(note["_id"])) for note in notes]
+@router.get("/notes", response_model=List[NoteSummary])
+async def get_notes(
+    token: str = Depends(get_current_user),
+    page: Pagination = Depends(),
+    fields: Tuple[str, ...] = Depends(NOTE_FIELDS),
+):
+    # an empty page is an empty list, not a 404
+    return await page.respond(notes_collection, {"owner": token}, CREATED_KEYS, fields)
 
 
 @router.get("/notes/{note_id}",response_model=NoteResponse)
 async def get_notes(note_id: str, token: str = Depends(get_current_user)):
-    notes = notes_collection.find_one(ObjectId(note_id))
+    notes = await notes_collection.find_one(ObjectId(note_id))
     if not notes:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No notes found"
@@ -46,7 +54,7 @@ async def update_notes(
 ):
     note.last_modified = datetime.utcnow()
     update_data = {k: v for k, v in note.dict().items() if v is not None}
-    notes = notes_collection.find_one_and_update(
+    notes = await notes_collection.find_one_and_update(
         {"_id":ObjectId(note_id)}, {"$set": update_data}, return_document=True
     )
     if not notes:
@@ -58,7 +66,7 @@ async def update_notes(
 
 @router.delete("/notes/{note_id}",response_model=dict)
 async def delete_note(note_id: str, token: str = Depends(get_current_user)):
-    notes = notes_collection.find_one_and_delete({"_id":ObjectId(note_id)})
+    notes = await notes_collection.find_one_and_delete({"_id":ObjectId(note_id)})
     if not notes:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No notes found"
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from datetime import date
+import numpy as np
+from fastapi.responses import ORJSONResponse
+from auth.auth import get_current_user
+from database.database import get_purchase_collection, get_sold_collection, get_trade_revision_collection
+from pymongo.asynchronous.collection import AsyncCollection
+from services.lots import PNL_MODES, PNL_PERIODS, PnlEngine, get_pnl_engine, realized_by_period
+from services.market_data import AsyncMarketDataProvider, get_async_market_data
+from services.quotes import QuoteCache, get_quote_cache
+from services.symbols import get_symbol_registry, to_ticker
+
+router = APIRouter()
+
+
+@router.get("/pnl", response_model=dict)
+async def get_pnl(
+    mode: str = Query("fifo", pattern="^(%s)$" % "|".join(PNL_MODES)),
+    period: str = Query("month", pattern="^(%s)$" % "|".join(PNL_PERIODS)),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    token: str = Depends(get_current_user),
+    purchases_collection: AsyncCollection = Depends(get_purchase_collection),
+    sold_collection: AsyncCollection = Depends(get_sold_collection),
+    revisions: AsyncCollection = Depends(get_trade_revision_collection),
+    engine: PnlEngine = Depends(get_pnl_engine),
+    quotes: QuoteCache = Depends(get_quote_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+):
+    pnl = await engine.get(token, mode, purchases_collection, sold_collection, revisions)
+    symbols = sorted(pnl.books)
+    open_quantity = np.array([pnl.books[symbol].open_quantity() for symbol in symbols])
+    open_cost = np.array([pnl.books[symbol].open_cost() for symbol in symbols])
+    realized = np.array([pnl.realized[symbol] for symbol in symbols])
+
+    tickers = [to_ticker(symbol) for symbol in symbols]
+    registry = get_symbol_registry()
+    held = [ticker for ticker, quantity in zip(tickers, open_quantity) if quantity > 0 and ticker in registry]
+    prices = await quotes.latest(held, market_data) if held else {}
+    last_price = np.array([prices.get(ticker, np.nan) for ticker in tickers], dtype=float)
+    market_value = np.where(open_quantity > 0, open_quantity * last_price, 0.0)
+    unrealized = market_value - open_cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_cost = np.where(open_quantity > 0, open_cost / open_quantity, np.nan)
+
+    columns = {
+        "symbol": symbols,
+        "open_quantity": open_quantity.astype(int).tolist(),
+        "average_cost": np.round(average_cost, 4).tolist(),
+        "open_cost": np.round(open_cost, 2).tolist(),
+        "last_price": np.round(last_price, 4).tolist(),
+        "market_value": np.round(market_value, 2).tolist(),
+        "unrealized_pnl": np.round(unrealized, 2).tolist(),
+        "realized_pnl": np.round(realized, 2).tolist(),
+    }
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    priced = ~np.isnan(unrealized)
+    return ORJSONResponse(
+        {
+            "mode": mode,
+            "symbols": rows,
+            "periods": realized_by_period(pnl, period, start, end),
+            "totals": {
+                "realized_pnl": round(float(realized.sum()), 2),
+                "unrealized_pnl": round(float(unrealized[priced].sum()), 2),
+                "open_cost": round(float(open_cost.sum()), 2),
+            },
+        }
+    )
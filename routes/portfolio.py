@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends
+import numpy as np
+import pandas as pd
+from fastapi.responses import ORJSONResponse
+from auth.auth import get_current_user
+from database.database import get_current_stocks_collection
+from pymongo.asynchronous.collection import AsyncCollection
+from services.market_data import AsyncMarketDataProvider, get_async_market_data
+from services.quotes import QuoteCache, get_quote_cache
+from services.symbols import get_symbol_registry, to_ticker
+
+router = APIRouter()
+
+
+@router.get("/portfolio/valuation", response_model=dict)
+async def get_portfolio_valuation(
+    token: str = Depends(get_current_user),
+    current_stocks_collection: AsyncCollection = Depends(get_current_stocks_collection),
+    quotes: QuoteCache = Depends(get_quote_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+):
+    holdings = pd.DataFrame(
+        await current_stocks_collection.find(
+            {"owner": token, "quantity": {"$gt": 0}},
+            {"_id": 0, "symbol": 1, "name": 1, "quantity": 1, "price_per_unit": 1},
+        ).to_list(None),
+        columns=["symbol", "name", "quantity", "price_per_unit"],
+    )
+    tickers = [to_ticker(symbol) for symbol in holdings["symbol"]]
+    registry = get_symbol_registry()
+    listed = [ticker for ticker in tickers if ticker in registry]
+    prices = await quotes.latest(listed, market_data) if listed else {}
+
+    quantity = holdings["quantity"].to_numpy(dtype=float)
+    average_price = holdings["price_per_unit"].to_numpy(dtype=float)
+    last_price = np.array([prices.get(ticker, np.nan) for ticker in tickers], dtype=float)
+    market_value = quantity * last_price
+    cost_basis = quantity * average_price
+    unrealized = market_value - cost_basis
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unrealized_pct = np.where(cost_basis != 0, unrealized / cost_basis * 100, np.nan)
+    total_value = np.nansum(market_value)
+    weight = market_value / total_value if total_value else np.full(len(tickers), np.nan)
+
+    priced = ~np.isnan(last_price)
+    total_cost = float(cost_basis[priced].sum())
+    total_unrealized = float(unrealized[priced].sum())
+    columns = {
+        "symbol": holdings["symbol"].tolist(),
+        "name": holdings["name"].tolist(),
+        "quantity": holdings["quantity"].tolist(),
+        "average_price": np.round(average_price, 4).tolist(),
+        "last_price": np.round(last_price, 4).tolist(),
+        "market_value": np.round(market_value, 2).tolist(),
+        "cost_basis": np.round(cost_basis, 2).tolist(),
+        "unrealized_pnl": np.round(unrealized, 2).tolist(),
+        "unrealized_pnl_pct": np.round(unrealized_pct, 2).tolist(),
+        "weight": np.round(weight, 6).tolist(),
+    }
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return ORJSONResponse(
+        {
+            "holdings": rows,
+            "totals": {
+                "market_value": round(float(total_value), 2),
+                "cost_basis": round(total_cost, 2),
+                "unrealized_pnl": round(total_unrealized, 2),
+                "unrealized_pnl_pct": round(total_unrealized / total_cost * 100, 2)
+                if total_cost
+                else None,
+                "unpriced_symbols": [
+                    symbol for symbol, ok in zip(columns["symbol"], priced) if not ok
+                ],
+            },
+        }
+    )
@@ -1,75 +1,63 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from typing import List, Tuple
 from auth.auth import get_current_user
-from database.database import get_sold_collection, get_current_stocks_collection
-from models.model import SoldRecordCreate, SoldRecordResponse
+from database.database import get_sold_collection, get_current_stocks_collection, get_trade_revision_collection
+from models.model import SoldRecordCreate, SoldRecordResponse, SoldRecordSummary
 from bson import ObjectId
 from datetime import datetime
-from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+from services.ledger import PositionLedger, get_position_ledger
+from services.lots import PnlEngine, get_pnl_engine
+from services.fields import SparseFields
+from services.pagination import ID_KEYS, Pagination
+from services.positions import apply_sell
 
 router = APIRouter()
 
+SOLD_FIELDS = SparseFields(
+    ("symbol", "timestamp", "price_per_unit_sold", "quantity", "created_at", "last_modified_at"),
+)
+
 
 @router.post("/sell_stocks")
 async def create_sold_record(
     sold: SoldRecordCreate,
     token: str = Depends(get_current_user),
-    get_current_stocks_collection: Collection = Depends(get_current_stocks_collection),
-    get_sold_collection: Collection = Depends(get_sold_collection),
+    get_current_stocks_collection: AsyncCollection = Depends(get_current_stocks_collection),
+    get_sold_collection: AsyncCollection = Depends(get_sold_collection),
 ):
-    purchase = get_current_stocks_collection.find_one(
-        {"symbol": sold.symbol, "owner": token}
-    )
-    if not purchase:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No purchase record found"
-        )
-    remaining_quantity = purchase["quantity"] - sold.quantity
-    if remaining_quantity < 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Not enough stocks to sell"
-        )
-    prev_net_profit = purchase.get("net_profit", 0.0)
-    net_profit = float(sold.price_per_unit_sold) * float(sold.quantity)
-    new_net_profit = net_profit + prev_net_profit
-    get_current_stocks_collection.update_one(
-        {"_id": ObjectId(purchase["_id"])},
-        {
-            "$set": {
-                "quantity": remaining_quantity,
-                "net_profit": new_net_profit,
-                "last_modified_at": datetime.utcnow(),
-            }
-        },
+    await apply_sell(
+        get_current_stocks_collection,
+        token,
+        sold.symbol,
+        sold.quantity,
+        sold.price_per_unit_sold,
     )
     sold_data= sold.dict()
     sold_data["owner"]=token
-    result= get_sold_collection.insert_one(sold_data)
+    result= await get_sold_collection.insert_one(sold_data)
     if not result:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create sold record")
     return SoldRecordResponse(**sold_data, id= str(result.inserted_id))
 
-@router.get("/sell_stocks", response_model=List[SoldRecordResponse])
+@router.get("/sell_stocks", response_model=List[SoldRecordSummary])
 async def get_sold_records(
     token: str = Depends(get_current_user),
-    get_sold_collection: Collection = Depends(get_sold_collection),
+    get_sold_collection: AsyncCollection = Depends(get_sold_collection),
+    page: Pagination = Depends(),
+    fields: Tuple[str, ...] = Depends(SOLD_FIELDS),
 ):
-    print(token)
-    solds = get_sold_collection.find({"owner":token})
-    if not solds:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No sold record found"
-        )
-    return [SoldRecordResponse(**sold, id=str(sold["_id"])) for sold in solds]
+    # an empty page is an empty list, not a 404
+    return await page.respond(get_sold_collection, {"owner": token}, ID_KEYS, fields)
 
 
 @router.get("/sell_stocks/{sold_id}", response_model=SoldRecordResponse)
 async def get_sold_record(
     sold_id: str,
     token: str = Depends(get_current_user),
-    get_sold_collection: Collection = Depends(get_sold_collection),
+    get_sold_collection: AsyncCollection = Depends(get_sold_collection),
 ):
-    solds = get_sold_collection.find_one({"_id": ObjectId(sold_id)})
+    solds = await get_sold_collection.find_one({"_id": ObjectId(sold_id)})
     if not solds:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No sold record found"
@@ -82,16 +70,19 @@ async def update_sold_record(
     sold_id: str,
     update_data: SoldRecordCreate,
     token: str = Depends(get_current_user),
-    get_current_stocks_collection: Collection = Depends(get_current_stocks_collection),
-    sold_collection: Collection = Depends(get_sold_collection),
+    get_current_stocks_collection: AsyncCollection = Depends(get_current_stocks_collection),
+    sold_collection: AsyncCollection = Depends(get_sold_collection),
+    ledger: PositionLedger = Depends(get_position_ledger),
+    pnl: PnlEngine = Depends(get_pnl_engine),
+    revisions: AsyncCollection = Depends(get_trade_revision_collection),
 ):
 
-    existing_sold = sold_collection.find_one({"owner": token, "_id": ObjectId(sold_id)})
+    existing_sold = await sold_collection.find_one({"owner": token, "_id": ObjectId(sold_id)})
     if not existing_sold:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No sold record found"
         )
-    purchase = get_current_stocks_collection.find_one(
+    purchase = await get_current_stocks_collection.find_one(
         {"symbol": update_data.symbol, "owner": token}
     )
     if not purchase:
@@ -99,36 +90,21 @@ async def update_sold_record(
             status_code=status.HTTP_404_NOT_FOUND, detail="No purchase record found"
         )
 
-    # revert the previous sold quantity and net profit
-    reverted_quantity = purchase["quantity"] + existing_sold["quantity"]
-    reverted_net_profit = purchase["net_profit"] - (
-        existing_sold["price_per_unit_sold"] * existing_sold["quantity"]
-    )
-    remaining_quantity = reverted_quantity - update_data.quantity
-    if remaining_quantity < 0:
+    # the sale being edited is given back before checking the new quantity
+    available = purchase["quantity"]
+    if existing_sold["symbol"] == update_data.symbol:
+        available += existing_sold["quantity"]
+    if available - update_data.quantity < 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Not enough stocks to sell"
         )
-
-    # calculate the new net profit after applying the new sale
-    update_net_profit = reverted_net_profit + (
-        update_data.price_per_unit_sold * update_data.quantity
-    )
-    get_current_stocks_collection.update_one(
-        {"_id": ObjectId(purchase["_id"])},
-        {
-            "$set": {
-                "quantity": remaining_quantity,
-                "net_profit": update_net_profit,
-                "last_modified_at": datetime.now(),
-            }
-        },
-    )
     # update the sold record with the new data
     update_dict = update_data.dict(exclude_unset=True)
     update_dict["last_modified_at"] = datetime.utcnow()
-    sold_collection.update_one({"_id": ObjectId(sold_id)}, {"$set": update_dict})
-    updated_sold = sold_collection.find_one({"_id": ObjectId(sold_id)})
+    await sold_collection.update_one({"_id": ObjectId(sold_id)}, {"$set": update_dict})
+    updated_sold = await sold_collection.find_one({"_id": ObjectId(sold_id)})
+    await ledger.sync(token, sorted({existing_sold["symbol"], update_data.symbol}))
+    await pnl.forget(token, revisions)
     return SoldRecordResponse(**updated_sold, id=str(updated_sold["_id"]))
 
 
@@ -136,43 +112,23 @@ async def update_sold_record(
 async def delete_sold_record(
     sold_id: str,
     token: str = Depends(get_current_user),
-    get_current_stocks_collection: Collection = Depends(get_current_stocks_collection),
-    sold_collection: Collection = Depends(get_sold_collection),
+    sold_collection: AsyncCollection = Depends(get_sold_collection),
+    ledger: PositionLedger = Depends(get_position_ledger),
+    pnl: PnlEngine = Depends(get_pnl_engine),
+    revisions: AsyncCollection = Depends(get_trade_revision_collection),
 ):
 
-    existing_sold = sold_collection.find_one({"owner": token, "_id": ObjectId(sold_id)})
+    existing_sold = await sold_collection.find_one({"owner": token, "_id": ObjectId(sold_id)})
     if not existing_sold:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No sold record found"
         )
-    purchase = get_current_stocks_collection.find_one(
-        {"symbol": existing_sold["symbol"], "owner": token}
-    )
-    if not purchase:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No purchase record found"
-        )
-
-    # revert the previous sold quantity and net profit
-    reverted_quantity = purchase["quantity"] + existing_sold["quantity"]
-    reverted_net_profit = purchase["net_profit"] - (
-        existing_sold["price_per_unit_sold"] * existing_sold["quantity"]
-    )
-    get_current_stocks_collection.update_one(
-        {"_id": ObjectId(purchase["_id"])},
-        {
-            "$set": {
-                "quantity": reverted_quantity,
-                "net_profit": reverted_net_profit,
-                "last_modified_at": datetime.now(),
-            }
-        },
-    )
-
-    result = sold_collection.delete_one({"_id": ObjectId(purchase["_id"])})
-    if not result:
+    result = await sold_collection.delete_one({"_id": ObjectId(sold_id)})
+    if not result.deleted_count:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete sold record",
         )
+    await ledger.sync(token, [existing_sold["symbol"]])
+    await pnl.forget(token, revisions)
     return {"message": "Successfully deleted the sold record"}
@@ -1,7 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
-import pandas as pd
-import yfinance as yf
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from typing import List, Optional
 from auth.auth import get_current_user
 from database.database import (
     get_purchase_collection,
@@ -10,14 +8,39 @@ from database.database import (
     get_current_stocks_collection,
 )
 from bson import ObjectId
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from models.model import (
-    SoldRecordResponse,
-    CurrentStockRecordResponse,
-    PurchaseRecordResponse,
     StockResponse,
+    HistoricalBatchRequest,
+)
+from fastapi.responses import ORJSONResponse
+from pymongo.asynchronous.collection import AsyncCollection
+from services.bar_cache import (
+    BarCache,
+    cached_series,
+    cached_series_many,
+    get_bar_cache,
+    intraday_window,
+)
+from services.coalescing import SingleFlight, get_market_data_flight
+from services.downsampling import DownsampleCache, get_downsample_cache
+from services.market_data import (
+    AsyncMarketDataProvider,
+    get_async_market_data,
+    slice_bars,
+)
+from services.positions import symbol_activity_pipeline
+from services.prewarm import PrewarmScheduler, get_prewarm_scheduler
+from services.quotes import QuoteCache, get_quote_cache
+from services.symbols import get_symbol_registry
+from services.serializers import (
+    DAILY_DATE_FORMAT,
+    COLUMNS_MEDIA_TYPE,
+    INTRADAY_DATE_FORMAT,
+    bar_format,
+    bars_response,
+    bars_to_columns,
 )
-from pymongo.collection import Collection
 import json
 import os
 # from pathlib import Path
@@ -29,141 +52,192 @@ import os
 # file_path = r"E:\all together website\historical and live data fro stocks\backend_for_notes_expense_stocks\routes\symbols_results.xlsx"
 # if not os.path.exists(file_path):
 #     raise FileNotFoundError(f"The file {file_path} does not exist.")
-valid_symbols = pd.read_excel('./routes/symbols_results.xlsx', sheet_name="Valid Symbols")[
-    "Valid Symbols"
-].tolist()
+valid_symbols = get_symbol_registry()
 
 
 router = APIRouter()
 
+MAX_BATCH_SYMBOLS = 100
+# batch windows and the cached series each one is cut from
+BATCH_WINDOWS = {"day": "5m", "week": "5m", "month": "5m", "max": "1d"}
+
 
 @router.get("/all_stocks_data_of_users/{symbol}", response_model=dict)
 async def get_all_stocks_data_of_user(
     symbol: str,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
     token: str = Depends(get_current_user),
-    current_stocks_collection: Collection = Depends(get_current_stocks_collection),
-    purchases_collection: Collection = Depends(get_purchase_collection),
-    sold_collection: Collection = Depends(get_sold_collection),
+    current_stocks_collection: AsyncCollection = Depends(get_current_stocks_collection),
+    purchases_collection: AsyncCollection = Depends(get_purchase_collection),
+    sold_collection: AsyncCollection = Depends(get_sold_collection),
 ):
-    solds_stock = sold_collection.find({"owner": token, "symbol": symbol})
-    if not solds_stock:
-        sold_record = []
-    else:
-        sold_record = [
-            SoldRecordResponse(**sold, id=str(sold["_id"])) for sold in solds_stock
-        ]
-    buy_stock = purchases_collection.find({"owner": token, "symbol": symbol})
-    if not buy_stock:
-        buy_record = []
-    else:
-        buy_record = [
-            PurchaseRecordResponse(**purchase, id=str(purchase["_id"]))
-            for purchase in buy_stock
-        ]
-    current_stock = current_stocks_collection.find_one(
-        {"owner": token, "symbol": symbol}
+    # limit keeps the newest trades; start/end bound the trade timestamp
+    pipeline = symbol_activity_pipeline(
+        token,
+        symbol,
+        purchases_collection,
+        sold_collection,
+        limit=limit,
+        start=datetime.combine(start, datetime.min.time()) if start else None,
+        end=datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None,
+    )
+    activity = await (await current_stocks_collection.aggregate(pipeline)).next()
+    return ORJSONResponse(
+        {
+            "sold_records": activity["sold_records"],
+            "buy_stock": activity["buy_stock"],
+            "current_stock": activity["current_stock"][0] if activity["current_stock"] else [],
+        }
     )
-    if not current_stock:
-        current_stock_record = []
-    else:
-        current_stock_record = CurrentStockRecordResponse(
-            **current_stock, id=str(current_stock["_id"])
-        )
-    return {
-        "sold_records": sold_record,
-        "buy_stock": buy_record,
-        "current_stock": current_stock_record,
-    }
 @router.get("/fetch_historical_last_month_data/{symbol}", response_model=dict)
-async def fetch_historical_last_month_data(symbol:str):
+async def fetch_historical_last_month_data(
+    symbol: str,
+    bar_cache: BarCache = Depends(get_bar_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    flight: SingleFlight = Depends(get_market_data_flight),
+    format: str = Depends(bar_format),
+    points: Optional[int] = Query(None, ge=3, le=10000),
+    downsampler: DownsampleCache = Depends(get_downsample_cache),
+):
     symbol = symbol.upper()
     symbol = symbol + ".NS"
     if symbol not in valid_symbols:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Invalid stock symbol"
         )
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=30)
-    start_date_str = start_date.strftime("%Y-%m-%d")
-    end_date_str = end_date.strftime("%Y-%m-%d")
-    data = yf.download(symbol, start=start_date_str, end=end_date_str, interval="5m")
-    df = pd.DataFrame(data)
-    last_month_data = [
-        {
-            "Date": date.strftime("%Y-%m-%d %I:%M %p"),
-            "Close": round(float(row["Close"]), 3),
-            "Volume": int(row["Volume"]),
-        }
-        for date, row in df.iterrows()
-    ]
-    return {"last_month_data":last_month_data}
+    series = await cached_series(symbol, "5m", bar_cache, market_data, flight)
+    data = intraday_window(series, "month")
+    data = downsampler.get((symbol, "month"), data, points)
+    return bars_response(data, "last_month_data", INTRADAY_DATE_FORMAT, format)
 @router.get("/fetch_historical_last_week_data/{symbol}", response_model=dict)
-async def fetch_historical_last_week_data(symbol:str):
+async def fetch_historical_last_week_data(
+    symbol: str,
+    bar_cache: BarCache = Depends(get_bar_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    flight: SingleFlight = Depends(get_market_data_flight),
+    format: str = Depends(bar_format),
+    points: Optional[int] = Query(None, ge=3, le=10000),
+    downsampler: DownsampleCache = Depends(get_downsample_cache),
+):
     symbol = symbol.upper()
     symbol = symbol + ".NS"
     if symbol not in valid_symbols:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Invalid stock symbol"
         )
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=7)
-    start_date_str = start_date.strftime("%Y-%m-%d")
-    end_date_str = end_date.strftime("%Y-%m-%d")
-    data = yf.download(symbol, start=start_date_str, end=end_date_str, interval="5m")
-    df = pd.DataFrame(data)
-    last_week_data = [
-        {
-            "Date": date.strftime("%Y-%m-%d %I:%M %p"),
-            "Close": round(float(row["Close"]), 3),
-            "Volume": int(row["Volume"]),
-        }
-        for date, row in df.iterrows()
-    ]
-    return {"last_week_data":last_week_data}
+    series = await cached_series(symbol, "5m", bar_cache, market_data, flight)
+    data = intraday_window(series, "week")
+    data = downsampler.get((symbol, "week"), data, points)
+    return bars_response(data, "last_week_data", INTRADAY_DATE_FORMAT, format)
 @router.get("/fetch_historical_last_day_data/{symbol}", response_model=dict)
-async def fetch_historical_last_day_data(symbol:str):
+async def fetch_historical_last_day_data(
+    symbol: str,
+    bar_cache: BarCache = Depends(get_bar_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    flight: SingleFlight = Depends(get_market_data_flight),
+    format: str = Depends(bar_format),
+    points: Optional[int] = Query(None, ge=3, le=10000),
+    downsampler: DownsampleCache = Depends(get_downsample_cache),
+):
     symbol = symbol.upper()
     symbol = symbol + ".NS"
     if symbol not in valid_symbols:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Invalid stock symbol"
         )
-    data = yf.download(symbol, period="1d", interval="5m")
-    df = pd.DataFrame(data)
-    last_day_data = [
-        {
-            "Date": date.strftime("%Y-%m-%d %I:%M %p"),
-            "Close": round(float(row["Close"]), 3),
-            "Volume": int(row["Volume"]),
-        }
-        for date, row in df.iterrows()
-    ]
-    return {"last_dau_data":last_day_data}
+    series = await cached_series(symbol, "5m", bar_cache, market_data, flight)
+    data = intraday_window(series, "day")
+    data = downsampler.get((symbol, "day"), data, points)
+    return bars_response(data, "last_dau_data", INTRADAY_DATE_FORMAT, format)
 @router.get("/fetch_historical_data_of_the_symbol/{symbol}", response_model=dict)
-async def fetch_historical_data_of_the_symbol(symbol: str):
+async def fetch_historical_data_of_the_symbol(
+    symbol: str,
+    bar_cache: BarCache = Depends(get_bar_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    flight: SingleFlight = Depends(get_market_data_flight),
+    format: str = Depends(bar_format),
+    points: Optional[int] = Query(None, ge=3, le=10000),
+    downsampler: DownsampleCache = Depends(get_downsample_cache),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    stream: bool = False,
+):
     symbol = symbol.upper()
     symbol = symbol + ".NS"
     if symbol not in valid_symbols:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Invalid stock symbol"
         )
-    data = yf.download(symbol, start="1950-01-01", end=None)
-    df = pd.DataFrame(data)
-    all_historical_data = [
-        {
-            "Date": date.strftime("%Y-%m-%d"),
-            "Close": round(float(row["Close"]), 3),
-            "Volume": int(row["Volume"]),
-        }
-        for date, row in df.iterrows()
-    ]
-    return {
-        "historical_data": all_historical_data,
-    }
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end"
+        )
+    df = await cached_series(symbol, "1d", bar_cache, market_data, flight)
+    df = slice_bars(df, start, end)
+    df = downsampler.get((symbol, "max", start, end), df, points)
+    return bars_response(df, "historical_data", DAILY_DATE_FORMAT, format, stream)
+
+@router.post("/historical/batch", response_model=dict)
+async def fetch_historical_batch(
+    request: HistoricalBatchRequest,
+    bar_cache: BarCache = Depends(get_bar_cache),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    flight: SingleFlight = Depends(get_market_data_flight),
+    downsampler: DownsampleCache = Depends(get_downsample_cache),
+):
+    if not 1 <= len(request.symbols) <= MAX_BATCH_SYMBOLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {MAX_BATCH_SYMBOLS} symbols can be requested",
+        )
+    names = list(dict.fromkeys(symbol.upper() for symbol in request.symbols))
+    valid = [name for name in names if name + ".NS" in valid_symbols]
+    invalid = [name for name in names if name + ".NS" not in valid_symbols]
+    interval = BATCH_WINDOWS[request.window]
+    series = await cached_series_many(
+        [name + ".NS" for name in valid], interval, bar_cache, market_data, flight
+    )
+    data = {}
+    for name in valid:
+        bars = series[name + ".NS"]
+        if interval == "5m":
+            bars = intraday_window(bars, request.window)
+        bars = downsampler.get((name + ".NS", request.window), bars, request.points)
+        data[name] = bars_to_columns(bars)
+    return ORJSONResponse(
+        {"window": request.window, "data": data, "invalid_symbols": invalid},
+        media_type=COLUMNS_MEDIA_TYPE,
+    )
+
 
 @router.get("/al_stocks_names",response_model=dict)
-async def get_all_stocks_names():
-    symbols=[]
-    for x in valid_symbols:
-        symbols.append(x.split('.')[0])
-    return {"symbols":symbols,}
\ No newline at end of file
+async def get_all_stocks_names(request: Request):
+    headers = {"ETag": valid_symbols.names_etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == valid_symbols.names_etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(valid_symbols.names_body, media_type="application/json", headers=headers)
+
+
+@router.get("/symbols/search", response_model=dict)
+async def search_symbols(
+    q: str = Query(..., min_length=1, max_length=32),
+    limit: int = Query(10, ge=1, le=50),
+):
+    return {"symbols": valid_symbols.search(q, limit)}
+
+
+@router.get("/market_data_metrics", response_model=dict)
+async def get_market_data_metrics(
+    flight: SingleFlight = Depends(get_market_data_flight),
+    market_data: AsyncMarketDataProvider = Depends(get_async_market_data),
+    scheduler: PrewarmScheduler = Depends(get_prewarm_scheduler),
+    quotes: QuoteCache = Depends(get_quote_cache),
+):
+    return {
+        "coalescing": flight.stats(),
+        "executor": market_data.stats(),
+        "prewarm": scheduler.stats(),
+        "quotes": quotes.stats(),
+    }
@@ -0,0 +1,24 @@
+import asyncio
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.responses import StreamingResponse
+from auth.auth import get_current_user
+from services.ledger import PositionLedger, get_position_ledger
+from services.serializers import NDJSON_MEDIA_TYPE
+from services.trade_import import read_statement, run_import
+
+router = APIRouter()
+
+
+@router.post("/trades/import")
+async def import_trades(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    token: str = Depends(get_current_user),
+    ledger: PositionLedger = Depends(get_position_ledger),
+):
+    # the file is parsed up front so format errors still get a plain status code;
+    # a large workbook takes openpyxl a while, so that happens off the event loop
+    frame = await asyncio.to_thread(read_statement, await file.read(), file.filename or "")
+    return StreamingResponse(
+        run_import(frame, token, ledger, dry_run=dry_run), media_type=NDJSON_MEDIA_TYPE
+    )
@@ -1,49 +1,56 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from typing import List, Tuple
 from auth.auth import  get_current_user
 from database.database import get_transaction_collection
-from models.model import TransactionCreate, TransactionUpdate, TransactionResponse
+from models.model import TransactionCreate, TransactionUpdate, TransactionResponse, TransactionSummary
 from bson import ObjectId
 from datetime import datetime
-from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+from services.fields import SparseFields
+from services.pagination import CREATED_KEYS, Pagination
 
 router = APIRouter()
 
+TRANSACTION_FIELDS = SparseFields(
+    (
+        "amount", "description", "tags", "transaction_type", "transaction_date",
+        "status_done", "second_party", "created_at", "last_modified",
+    ),
+)
+
 
 @router.post("/transactions", response_model=TransactionResponse)
 async def create_transaction(
     transaction: TransactionCreate,
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_transaction_collection),
+    db: AsyncCollection = Depends(get_transaction_collection),
 ):
     transaction_data = transaction.dict()
     transaction_data["owner"] = token
     transaction_data["created_at"] = datetime.now()
     transaction_data["last_modified"] = datetime.now()
-    result = db.insert_one(transaction_data)
+    result = await db.insert_one(transaction_data)
     return TransactionResponse(**transaction_data, id=str(result.inserted_id))
 
 
-@router.get("/transactions", response_model=List[TransactionResponse])
+@router.get("/transactions", response_model=List[TransactionSummary])
 async def get_transactions(
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_transaction_collection),
+    db: AsyncCollection = Depends(get_transaction_collection),
+    page: Pagination = Depends(),
+    fields: Tuple[str, ...] = Depends(TRANSACTION_FIELDS),
 ):
-    transactions = db.find({"owner": token})
-    if not transactions:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No transactions found"
-        )
-    return [TransactionResponse(**t, id=str(t["_id"])) for t in transactions]
+    # an empty page is an empty list, not a 404
+    return await page.respond(db, {"owner": token}, CREATED_KEYS, fields)
 
 
 @router.get("/transactions/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: str,
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_transaction_collection),
+    db: AsyncCollection = Depends(get_transaction_collection),
 ):
-    transaction = db.find_one({"_id": ObjectId(transaction_id), "owner": token})
+    transaction = await db.find_one({"_id": ObjectId(transaction_id), "owner": token})
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
@@ -56,9 +63,9 @@ async def update_transaction(
     transaction_id: str,
     update_data: TransactionUpdate,
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_transaction_collection),
+    db: AsyncCollection = Depends(get_transaction_collection),
 ):
-    existing_transaction = db.find_one(
+    existing_transaction = await db.find_one(
         {"_id": ObjectId(transaction_id), "owner": token}
     )
     if not existing_transaction:
@@ -72,8 +79,8 @@ async def update_transaction(
         )
     update_dict = update_data.dict(exclude_unset=True)
     update_dict["last_modified"] = datetime.utcnow()
-    db.update_one({"_id": ObjectId(transaction_id)}, {"$set": update_dict})
-    update_transactions = db.find_one({"_id": ObjectId(transaction_id), "owner": token})
+    await db.update_one({"_id": ObjectId(transaction_id)}, {"$set": update_dict})
+    update_transactions = await db.find_one({"_id": ObjectId(transaction_id), "owner": token})
     return TransactionResponse(
         **update_transactions, id=str(update_transactions["_id"])
     )
@@ -83,9 +90,9 @@ async def update_transaction(
 async def delete_transaction(
     transaction_id: str,
     token: str = Depends(get_current_user),
-    db: Collection = Depends(get_transaction_collection),
+    db: AsyncCollection = Depends(get_transaction_collection),
 ):
-    existing_transaction = db.find_one(
+    existing_transaction = await db.find_one(
         {"_id": ObjectId(transaction_id), "owner": token}
     )
     if not existing_transaction:
@@ -97,5 +104,5 @@ async def delete_transaction(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Transaction is already done",
         )
-    db.delete_one({"_id": ObjectId(transaction_id)})
+    await db.delete_one({"_id": ObjectId(transaction_id)})
     return {"Message": "Transaction deleted successfully"}
@@ -18,13 +18,9 @@ router = APIRouter()
 async def create_user(user: User):
     hashed_password = hash_password(user.password)
     user_data = {"email": user.email, "password": hashed_password}
-    userr= user_collection.find_one({"email": user.email})
-    if userr:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered."
-        )
+    # the unique email index makes the insert itself the duplicate check
     try:
-        user_collection.insert_one(user_data)
+        await user_collection.insert_one(user_data)
     except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered."
@@ -35,7 +31,7 @@ async def create_user(user: User):
 
 @router.post("/signin", response_model=dict)
 async def signin(form_data: User):
-    user = user_collection.find_one({"email": form_data.email})
+    user = await user_collection.find_one({"email": form_data.email})
     if not user or not verify_password(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,7 +43,7 @@ async def signin(form_data: User):
 
 @router.get("/profile", response_model=UserOut)
 async def get_profile(token: str = Depends(get_current_user)):
-    user = user_collection.find_one({"email": token})
+    user = await user_collection.find_one({"email": token})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -1,24 +1,30 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from typing import List, Tuple
 from auth.auth import get_current_user
 from database.database import  get_current_stocks_collection
-from models.model import  CurrentStockRecordResponse
-from pymongo.collection import Collection
+from models.model import  CurrentStockRecordResponse, CurrentStockSummary
+from pymongo.asynchronous.collection import AsyncCollection
+from services.fields import SparseFields
+from services.pagination import SYMBOL_KEYS, Pagination
 
 router = APIRouter()
 
-@router.get("/user_stocks",response_model=List[CurrentStockRecordResponse])
+STOCK_FIELDS = SparseFields(
+    ("symbol", "name", "price_per_unit", "quantity", "created_at", "last_updated", "net_profit", "owner"),
+)
+
+@router.get("/user_stocks",response_model=List[CurrentStockSummary])
 async def get_user_stocks( token: str=Depends(get_current_user),
-                          user_stocks: Collection = Depends(get_current_stocks_collection)):
-    user_stocks_data = user_stocks.find({"owner": token})
-    if not user_stocks_data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No stocks found")
-    return [CurrentStockRecordResponse(**stock, id=str(stock["_id"])) for stock in user_stocks_data]
+                          user_stocks: AsyncCollection = Depends(get_current_stocks_collection),
+                          page: Pagination = Depends(),
+                          fields: Tuple[str, ...] = Depends(STOCK_FIELDS)):
+    # an empty page is an empty list, not a 404
+    return await page.respond(user_stocks, {"owner": token}, SYMBOL_KEYS, fields)
 
 @router.get("/user_stocks/{symbol}",response_model=CurrentStockRecordResponse)
 async def get_user_stock(symbol:str,token: str=Depends(get_current_user),
-                          user_stocks: Collection = Depends(get_current_stocks_collection)):
-    user_stock_data = user_stocks.find_one({"owner": token, "symbol": symbol})
+                          user_stocks: AsyncCollection = Depends(get_current_stocks_collection)):
+    user_stock_data = await user_stocks.find_one({"owner": token, "symbol": symbol})
     if not user_stock_data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No stock found")
     return CurrentStockRecordResponse(**user_stock_data, id=str(user_stock_data["_id"]))
\ No newline at end of file
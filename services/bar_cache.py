@@ -0,0 +1,220 @@
+from typing import Dict, List
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from pymongo.collection import Collection
+from database.database import get_stock_data_collection
+from services.bar_store import BAR_STORE_DIR, BarStore
+from services.coalescing import SingleFlight
+from services.market_data import (
+    BAR_COLUMNS,
+    AsyncMarketDataProvider,
+    MarketDataProvider,
+    get_market_data_provider,
+    normalize_bars,
+)
+
+# how far back a cold fetch reaches for each interval; yfinance only serves
+# intraday bars for the last 60 days so those series are trimmed to match
+FULL_FETCH = {
+    "1d": {"start": "1950-01-01"},
+    "5m": {"period": "1mo"},
+}
+RETENTION = {
+    "5m": timedelta(days=31),
+}
+# intraday chart windows, all served as slices of the one rolling 5m series
+INTRADAY_WINDOWS = {
+    "month": timedelta(days=30),
+    "week": timedelta(days=7),
+}
+
+
+def bars_to_records(df: pd.DataFrame) -> list:
+    columns = [df[column].tolist() for column in BAR_COLUMNS]
+    return [
+        {"Date": date, **dict(zip(BAR_COLUMNS, values))}
+        for date, *values in zip(df.index.to_pydatetime(), *columns)
+    ]
+
+
+def same_bars(left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    if len(left) != len(right):
+        return False
+    if not pd.DatetimeIndex(left.index).as_unit("ns").equals(pd.DatetimeIndex(right.index).as_unit("ns")):
+        return False
+    return np.array_equal(
+        left.reindex(columns=BAR_COLUMNS).to_numpy(dtype=float),
+        right.reindex(columns=BAR_COLUMNS).to_numpy(dtype=float),
+        equal_nan=True,
+    )
+
+
+def records_to_bars(records: list) -> pd.DataFrame:
+    if not records:
+        return normalize_bars(None)
+    df = pd.DataFrame.from_records(records, index="Date")
+    return normalize_bars(df)
+
+
+class MongoBarBackend:
+    # one document per (symbol, interval) in the stock_data collection, bars in `history`
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def load(self, symbol: str, interval: str) -> pd.DataFrame:
+        cached = self.collection.find_one(
+            {"symbol": symbol, "interval": interval}, {"_id": 0, "history": 1}
+        )
+        return records_to_bars(cached["history"] if cached else [])
+
+    def save(self, symbol: str, interval: str, bars: pd.DataFrame, fresh: pd.DataFrame) -> None:
+        now = datetime.now()
+        query = {"symbol": symbol, "interval": interval}
+        if len(fresh) == len(bars):
+            # cold or expired series: nothing stored is kept, so write it whole
+            self.collection.update_one(
+                query,
+                {
+                    "$set": {"history": bars_to_records(bars), "last_modified_at": now},
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+            return
+        # a refresh only swaps the tail: stored bars from the first fresh one on
+        # are dropped, along with any the retention window cut, and the fresh
+        # bars appended server-side, so the rest of the history is never resent
+        first, cutoff = fresh.index[0].to_pydatetime(), bars.index[0].to_pydatetime()
+        kept = {
+            "$filter": {
+                "input": "$history",
+                "cond": {"$and": [{"$gte": ["$$this.Date", cutoff]}, {"$lt": ["$$this.Date", first]}]},
+            }
+        }
+        self.collection.update_one(
+            query,
+            [
+                {
+                    "$set": {
+                        "history": {"$concatArrays": [kept, bars_to_records(fresh)]},
+                        "last_modified_at": now,
+                    }
+                }
+            ],
+        )
+
+
+class BarCache:
+    def __init__(self, backend, provider: MarketDataProvider):
+        self.backend = backend
+        self.provider = provider
+
+    def _tail_request(self, interval: str, stored: pd.DataFrame) -> dict:
+        retention = RETENTION.get(interval)
+        if stored.empty or (
+            retention is not None and stored.index[-1] < datetime.now() - retention
+        ):
+            return FULL_FETCH[interval]
+        # refetch from the day of the last stored bar so a still-forming bar is replaced
+        return {"start": stored.index[-1].strftime("%Y-%m-%d")}
+
+    def _merge(
+        self, symbol: str, interval: str, stored: pd.DataFrame, fresh: pd.DataFrame
+    ) -> pd.DataFrame:
+        if fresh.empty:
+            return stored
+        if stored.empty:
+            bars = fresh
+        else:
+            bars = pd.concat([stored[stored.index < fresh.index[0]], fresh])
+        retention = RETENTION.get(interval)
+        if retention is not None:
+            bars = bars[bars.index >= bars.index[-1] - retention]
+        # a refresh inside an unchanged bar writes nothing
+        if not same_bars(stored[stored.index >= fresh.index[0]], fresh):
+            self.backend.save(symbol, interval, bars, fresh)
+        return bars
+
+    def get_bars(self, symbol: str, interval: str = "1d") -> pd.DataFrame:
+        stored = self.backend.load(symbol, interval)
+        request = self._tail_request(interval, stored)
+        fresh = self.provider.fetch(symbol, interval=interval, **request)
+        return self._merge(symbol, interval, stored, fresh)
+
+    def get_many(self, symbols: List[str], interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        # symbols needing the same tail share one grouped multi-ticker download
+        stored = {symbol: self.backend.load(symbol, interval) for symbol in symbols}
+        groups: Dict[tuple, List[str]] = {}
+        for symbol, bars in stored.items():
+            request = tuple(sorted(self._tail_request(interval, bars).items()))
+            groups.setdefault(request, []).append(symbol)
+        results = {}
+        for request, group in groups.items():
+            frames = self.provider.fetch_many(group, interval=interval, **dict(request))
+            for symbol in group:
+                fresh = frames.get(symbol)
+                if fresh is None:
+                    fresh = normalize_bars(None)
+                results[symbol] = self._merge(symbol, interval, stored[symbol], fresh)
+        return results
+
+
+def series_key(ticker: str, interval: str) -> tuple:
+    # shared by every caller so requests and background warm-ups coalesce
+    return (ticker, interval, "series")
+
+
+async def cached_series(
+    ticker: str,
+    interval: str,
+    bar_cache: BarCache,
+    market_data: AsyncMarketDataProvider,
+    flight: SingleFlight,
+) -> pd.DataFrame:
+    return await flight.run(
+        series_key(ticker, interval),
+        market_data.run,
+        bar_cache.get_bars,
+        ticker,
+        interval=interval,
+    )
+
+
+async def cached_series_many(
+    tickers: List[str],
+    interval: str,
+    bar_cache: BarCache,
+    market_data: AsyncMarketDataProvider,
+    flight: SingleFlight,
+) -> Dict[str, pd.DataFrame]:
+    # fresh or in-flight series are shared; the rest are refreshed together
+    tickers_by_key = {series_key(ticker, interval): ticker for ticker in tickers}
+
+    async def refresh(keys: List[tuple]) -> Dict[tuple, pd.DataFrame]:
+        missing = [tickers_by_key[key] for key in keys]
+        fetched = await market_data.run(bar_cache.get_many, missing, interval=interval)
+        return {series_key(ticker, interval): bars for ticker, bars in fetched.items()}
+
+    series = await flight.run_many(list(tickers_by_key), refresh)
+    return {tickers_by_key[key]: bars for key, bars in series.items()}
+
+
+def intraday_window(series: pd.DataFrame, window: str) -> pd.DataFrame:
+    # "day" is the latest session present; other windows count back from now
+    if series.empty:
+        return series
+    if window == "day":
+        start = series.index[-1].normalize()
+    else:
+        start = pd.Timestamp(datetime.now() - INTRADAY_WINDOWS[window]).normalize()
+    return series.iloc[series.index.searchsorted(start) :]
+
+
+def get_bar_cache() -> BarCache:
+    # BAR_STORE_DIR switches persistence from Mongo documents to the mmap store
+    if BAR_STORE_DIR:
+        backend = BarStore(BAR_STORE_DIR)
+    else:
+        backend = MongoBarBackend(get_stock_data_collection())
+    return BarCache(backend, get_market_data_provider())
@@ -0,0 +1,199 @@
+import argparse
+import os
+import re
+import sys
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from services.market_data import normalize_bars
+
+BAR_STORE_DIR = os.getenv("BAR_STORE_DIR")
+# segments a series may collect before a save folds them back into the base file
+BAR_STORE_MAX_SEGMENTS = int(os.getenv("BAR_STORE_MAX_SEGMENTS", "8"))
+BAR_DTYPE = np.dtype(
+    [
+        ("Date", "<M8[ns]"),
+        ("Open", "<f8"),
+        ("High", "<f8"),
+        ("Low", "<f8"),
+        ("Close", "<f8"),
+        ("Volume", "<i8"),
+    ]
+)
+# the pointer names the live generation; a compaction writes a new generation's
+# base and swaps the pointer, so a file a reader may have mapped is never replaced
+POINTER_FILE = "CURRENT"
+BASE_PATTERN = re.compile(r"^base-(\d{8})\.npy$")
+SEGMENT_PATTERN = re.compile(r"^seg-(\d{8})-(\d{8})\.npy$")
+
+
+def bars_to_array(df: pd.DataFrame) -> np.ndarray:
+    array = np.empty(len(df), dtype=BAR_DTYPE)
+    array["Date"] = pd.DatetimeIndex(df.index).as_unit("ns").values
+    for column in BAR_DTYPE.names[1:]:
+        array[column] = df[column].to_numpy(dtype=BAR_DTYPE[column])
+    return array
+
+
+def array_to_bars(array: np.ndarray) -> pd.DataFrame:
+    # column views over the mapped file; pandas keeps them as separate blocks
+    return pd.DataFrame(
+        {column: array[column] for column in BAR_DTYPE.names[1:]},
+        index=pd.DatetimeIndex(array["Date"], name="Date"),
+        copy=False,
+    )
+
+
+class BarStore:
+    # one directory per (interval, symbol) holding, per generation, a compacted
+    # base file plus append-only segments; a segment supersedes every earlier bar
+    # at or after its first timestamp, so the still-forming last bar can be rewritten
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _series_dir(self, symbol: str, interval: str) -> Path:
+        return self.root / interval / symbol
+
+    def _generation(self, directory: Path) -> Optional[int]:
+        try:
+            return int((directory / POINTER_FILE).read_text())
+        except FileNotFoundError:
+            return None
+
+    def _files(self, symbol: str, interval: str) -> List[Path]:
+        directory = self._series_dir(symbol, interval)
+        generation = self._generation(directory)
+        if generation is None:
+            return []
+        segments = sorted(
+            path
+            for path in directory.iterdir()
+            if (match := SEGMENT_PATTERN.match(path.name)) and int(match.group(1)) == generation
+        )
+        return [directory / f"base-{generation:08d}.npy"] + segments
+
+    def _write(self, path: Path, array: np.ndarray) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as handle:
+            np.save(handle, array)
+        os.replace(temporary, path)
+
+    def _swap(self, directory: Path, array: np.ndarray) -> None:
+        # the new base gets a fresh name, only the small pointer file is replaced
+        generation = (self._generation(directory) or 0) + 1
+        self._write(directory / f"base-{generation:08d}.npy", array)
+        temporary = directory / (POINTER_FILE + ".tmp")
+        temporary.write_text(str(generation))
+        os.replace(temporary, directory / POINTER_FILE)
+        for path in directory.iterdir():
+            match = BASE_PATTERN.match(path.name) or SEGMENT_PATTERN.match(path.name)
+            if match and int(match.group(1)) != generation:
+                try:
+                    path.unlink()
+                except OSError:
+                    # still mapped by a reader on Windows; a later compaction retries
+                    pass
+
+    def _read_parts(self, symbol: str, interval: str) -> List[np.ndarray]:
+        # a compaction in another process can remove the generation between reading
+        # the pointer and opening its files; the pointer then names a newer one
+        for attempt in range(3):
+            try:
+                return [np.load(path, mmap_mode="r") for path in self._files(symbol, interval)]
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def _read_array(self, symbol: str, interval: str) -> np.ndarray:
+        parts = [part for part in self._read_parts(symbol, interval) if len(part)]
+        if not parts:
+            return np.empty(0, dtype=BAR_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        # a part keeps only the bars before the earliest start of any later part,
+        # so a segment that starts earlier than the one before it still wins
+        kept, later_start = [], None
+        for part in reversed(parts):
+            first = part["Date"][0]
+            if later_start is not None:
+                part = part[: np.searchsorted(part["Date"], later_start)]
+            kept.append(part)
+            later_start = first if later_start is None else min(later_start, first)
+        return np.concatenate(kept[::-1])
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
+        array = self._read_array(symbol, interval)
+        dates = array["Date"]
+        lower = np.searchsorted(dates, np.datetime64(start, "ns")) if start is not None else 0
+        upper = (
+            np.searchsorted(dates, np.datetime64(end, "ns")) if end is not None else len(dates)
+        )
+        return array_to_bars(array[lower:upper])
+
+    def load(self, symbol: str, interval: str) -> pd.DataFrame:
+        return self.read(symbol, interval)
+
+    def save(self, symbol: str, interval: str, bars: pd.DataFrame, fresh: pd.DataFrame) -> None:
+        directory = self._series_dir(symbol, interval)
+        files = self._files(symbol, interval)
+        # `bars` is the whole merged series, so a new base is the compaction;
+        # past the limit it also keeps reads on a single mapped file
+        if not files or len(fresh) == len(bars) or len(files) >= BAR_STORE_MAX_SEGMENTS:
+            self._swap(directory, bars_to_array(bars))
+            return
+        generation = self._generation(directory)
+        last = SEGMENT_PATTERN.match(files[-1].name)
+        sequence = int(last.group(2)) + 1 if last else 0
+        path = directory / f"seg-{generation:08d}-{sequence:08d}.npy"
+        self._write(path, bars_to_array(normalize_bars(fresh)))
+
+    def compact(self, symbol: str, interval: str, retention: Optional[timedelta] = None) -> int:
+        if not self._files(symbol, interval):
+            return 0
+        array = np.array(self._read_array(symbol, interval))
+        if retention is not None and len(array):
+            cutoff = array["Date"][-1] - np.timedelta64(retention)
+            array = array[np.searchsorted(array["Date"], cutoff) :]
+        self._swap(self._series_dir(symbol, interval), array)
+        return len(array)
+
+    def series(self, interval: Optional[str] = None) -> List[tuple]:
+        intervals = [interval] if interval else [p.name for p in self.root.iterdir() if p.is_dir()]
+        found = []
+        for name in intervals:
+            directory = self.root / name
+            if directory.is_dir():
+                found.extend((symbol.name, name) for symbol in sorted(directory.iterdir()))
+        return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from services.bar_cache import RETENTION
+
+    parser = argparse.ArgumentParser(description="Maintain the on-disk bar store")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("--root", default=BAR_STORE_DIR, required=BAR_STORE_DIR is None)
+    parser.add_argument("--interval")
+    parser.add_argument("--symbol")
+    args = parser.parse_args(argv)
+    store = BarStore(args.root)
+    for symbol, interval in store.series(args.interval):
+        if args.symbol and symbol != args.symbol:
+            continue
+        rows = store.compact(symbol, interval, RETENTION.get(interval))
+        sys.stdout.write(f"{interval}/{symbol}: {rows} bars\n")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m services.bar_store compact [--interval 5m] [--symbol TCS.NS]
+    sys.exit(main())
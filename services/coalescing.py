@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List
+
+MARKET_DATA_FRESH_SECONDS = float(os.getenv("MARKET_DATA_FRESH_SECONDS", "60"))
+
+
+class SingleFlight:
+    # concurrent calls with the same key share one await of the coroutine
+    # function, and results are replayed for `fresh_for` seconds afterwards
+    def __init__(self, fresh_for: float = MARKET_DATA_FRESH_SECONDS, max_entries: int = 1024):
+        self.fresh_for = fresh_for
+        self.max_entries = max_entries
+        self._inflight: dict = {}
+        self._recent: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.fresh_hits = 0
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        self._recent[key] = (time.monotonic() + self.fresh_for, value)
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def _lookup(self, key: Hashable):
+        entry = self._recent.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._recent[key]
+            return False, None
+        return True, value
+
+    async def _execute(self, key: Hashable, func: Callable, args, kwargs):
+        try:
+            value = await func(*args, **kwargs)
+            if self.fresh_for > 0:
+                self._remember(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def run(self, key: Hashable, func: Callable, *args, **kwargs):
+        self.requests += 1
+        found, value = self._lookup(key)
+        if found:
+            self.fresh_hits += 1
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(self._execute(key, func, args, kwargs))
+            self._inflight[key] = task
+        # shield so one cancelled client does not abort the download for the others
+        return await asyncio.shield(task)
+
+    async def run_many(self, keys: List[Hashable], func: Callable, *args, **kwargs) -> dict:
+        # `func(missing_keys, ...)` returns {key: value} for keys neither fresh nor
+        # already in flight; each of them gets its own in-flight entry over that one
+        # call, so single requests for any of them join the batch and vice versa
+        self.requests += len(keys)
+        results, waiting, missing = {}, {}, []
+        for key in keys:
+            found, value = self._lookup(key)
+            if found:
+                self.fresh_hits += 1
+                results[key] = value
+            elif key in self._inflight:
+                self.coalesced += 1
+                waiting[key] = self._inflight[key]
+            else:
+                missing.append(key)
+        if missing:
+            self.upstream_calls += 1
+            batch = asyncio.ensure_future(func(missing, *args, **kwargs))
+            for key in missing:
+                task = asyncio.ensure_future(self._execute(key, _pick, (batch, key), {}))
+                self._inflight[key] = task
+                waiting[key] = task
+        values = await asyncio.gather(*(asyncio.shield(task) for task in waiting.values()))
+        results.update(zip(waiting, values))
+        return results
+
+    def forget(self, key: Hashable) -> None:
+        self._recent.pop(key, None)
+
+    def stats(self) -> dict:
+        saved = self.coalesced + self.fresh_hits
+        return {
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "fresh_hits": self.fresh_hits,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round(saved / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+async def _pick(batch: asyncio.Future, key: Hashable):
+    return (await asyncio.shield(batch))[key]
+
+
+market_data_flight = SingleFlight()
+
+
+def get_market_data_flight() -> SingleFlight:
+    return market_data_flight
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+import numpy as np
+import pandas as pd
+
+MAX_CACHED_SERIES = 512
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets scored for every bucket at once: keeps the
+    # first and last bar and, per bucket, the bar forming the largest triangle
+    # with the mean of the previous bucket and the mean of the next one (the end
+    # bars stand in at either edge); anchoring on the previous mean instead of the
+    # previous pick is what lets all buckets be scored without a loop
+    size = len(x)
+    if points >= size or points < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+    starts = edges[:-1] - 1
+    lengths = np.diff(edges)
+    inner_x, inner_y = x[1 : size - 1], y[1 : size - 1]
+    mean_x = np.add.reduceat(inner_x, starts) / lengths
+    mean_y = np.add.reduceat(inner_y, starts) / lengths
+    bucket = np.repeat(np.arange(len(lengths)), lengths)
+    previous_x = np.r_[x[0], mean_x[:-1]][bucket]
+    previous_y = np.r_[y[0], mean_y[:-1]][bucket]
+    next_x = np.r_[mean_x[1:], x[-1]][bucket]
+    next_y = np.r_[mean_y[1:], y[-1]][bucket]
+    areas = np.abs(
+        (previous_x - next_x) * (inner_y - previous_y)
+        - (previous_x - inner_x) * (next_y - previous_y)
+    )
+    areas[np.isnan(areas)] = -np.inf
+    # first bar reaching its bucket's maximum
+    best = areas == np.repeat(np.maximum.reduceat(areas, starts), lengths)
+    hits = np.flatnonzero(best)
+    _, first = np.unique(bucket[hits], return_index=True)
+    return np.r_[0, hits[first] + 1, size - 1]
+
+
+def lttb(df: pd.DataFrame, points: int, column: str = "Close") -> pd.DataFrame:
+    x = pd.DatetimeIndex(df.index).asi8.astype(float)
+    y = df[column].to_numpy(dtype=float)
+    return df.iloc[lttb_indices(x, y, points)]
+
+
+class DownsampleCache:
+    # results are keyed on the last bar too, so a refreshed series never hits
+    # a stale reduction
+    def __init__(self, max_entries: int = MAX_CACHED_SERIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, pd.DataFrame]" = OrderedDict()
+
+    def get(self, key: Hashable, df: pd.DataFrame, points: Optional[int]) -> pd.DataFrame:
+        if points is None or len(df) <= points:
+            return df
+        full_key = (key, points, len(df), df.index[-1])
+        reduced = self._entries.get(full_key)
+        if reduced is None:
+            reduced = lttb(df, points)
+            self._entries[full_key] = reduced
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(full_key)
+        return reduced
+
+
+downsample_cache = DownsampleCache()
+
+
+def get_downsample_cache() -> DownsampleCache:
+    return downsample_cache
@@ -0,0 +1,39 @@
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Query, status
+
+
+class SparseFields:
+    # list dependency: `fields=title,tags` picks the response fields, and the same
+    # selection becomes the Mongo projection so unrequested bodies stay in the database;
+    # without `fields` a list keeps its full shape minus `default`-excluded large fields
+    def __init__(self, allowed: Tuple[str, ...], default: Optional[Tuple[str, ...]] = None):
+        self.allowed = allowed
+        self.default = allowed if default is None else default
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(None, description="Comma-separated fields; id is always included"),
+    ) -> Tuple[str, ...]:
+        if fields is None:
+            return self.default
+        selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in selected if name != "id" and name not in self.allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Unknown fields: %s" % ", ".join(unknown),
+            )
+        return tuple(name for name in selected if name != "id")
+
+
+def projection(selected: Tuple[str, ...]) -> dict:
+    return {name: 1 for name in selected}
+
+
+def shape(documents: List[dict], selected: Tuple[str, ...]) -> List[dict]:
+    # one dict per document with `id` and the selected fields it has; no model is
+    # built, the summary models only document the response
+    return [
+        {"id": str(document["_id"]), **{name: document[name] for name in selected if name in document}}
+        for document in documents
+    ]
@@ -0,0 +1,159 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+MAX_MEMOIZED_SERIES = 1024
+
+# defaults per indicator; only these parameters are accepted for each one
+INDICATOR_PARAMS: Dict[str, Dict[str, float]] = {
+    "sma": {"window": 20},
+    "ema": {"window": 20},
+    "rsi": {"window": 14},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "bollinger": {"window": 20, "num_std": 2},
+    "vwap": {"window": 20},
+}
+# columns that carry recursive state between updates and are not returned
+_STATE_COLUMNS = {
+    "rsi": ["_gain", "_loss"],
+    "macd": ["_fast", "_slow"],
+}
+
+
+def _ema(values: pd.Series, alpha: float, seed: Optional[float] = None) -> pd.Series:
+    # y[t] = (1 - alpha) * y[t-1] + alpha * x[t]; a seed continues a previous run
+    if seed is None or np.isnan(seed):
+        return values.ewm(alpha=alpha, adjust=False).mean()
+    seeded = pd.concat([pd.Series([seed]), values.reset_index(drop=True)])
+    result = seeded.ewm(alpha=alpha, adjust=False).mean().iloc[1:]
+    result.index = values.index
+    return result
+
+
+def _span_alpha(span: float) -> float:
+    return 2.0 / (float(span) + 1.0)
+
+
+def _compute(name: str, bars: pd.DataFrame, params: dict, state: Optional[pd.Series]) -> pd.DataFrame:
+    # `bars` holds the rows to emit; for recursive indicators `state` is the
+    # last emitted row before them, for rolling ones `bars` carries lookback rows
+    close = bars["Close"].astype(float)
+    if name == "sma":
+        return pd.DataFrame({"sma": close.rolling(int(params["window"])).mean()})
+    if name == "ema":
+        seed = None if state is None else state["ema"]
+        return pd.DataFrame({"ema": _ema(close, _span_alpha(params["window"]), seed)})
+    if name == "bollinger":
+        window = int(params["window"])
+        middle = close.rolling(window).mean()
+        spread = close.rolling(window).std(ddof=0) * float(params["num_std"])
+        return pd.DataFrame({"middle": middle, "upper": middle + spread, "lower": middle - spread})
+    if name == "vwap":
+        window = int(params["window"])
+        volume = bars["Volume"].astype(float)
+        typical = (bars["High"] + bars["Low"] + close) / 3.0
+        traded = (typical * volume).rolling(window).sum()
+        return pd.DataFrame({"vwap": traded / volume.rolling(window).sum().replace(0, np.nan)})
+    if name == "rsi":
+        alpha = 1.0 / float(params["window"])
+        delta = close.diff()
+        seeds = (None, None)
+        if state is not None and len(delta):
+            delta.iloc[0] = close.iloc[0] - state["_close"]
+            seeds = (state["_gain"], state["_loss"])
+        gain = _ema(delta.clip(lower=0), alpha, seeds[0])
+        loss = _ema(-delta.clip(upper=0), alpha, seeds[1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(loss.to_numpy() == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+        rsi = np.where(np.isnan(gain.to_numpy()), np.nan, rsi)
+        return pd.DataFrame({"rsi": rsi, "_gain": gain, "_loss": loss}, index=bars.index)
+    if name == "macd":
+        fast = _ema(close, _span_alpha(params["fast"]), None if state is None else state["_fast"])
+        slow = _ema(close, _span_alpha(params["slow"]), None if state is None else state["_slow"])
+        line = fast - slow
+        signal = _ema(line, _span_alpha(params["signal"]), None if state is None else state["signal"])
+        return pd.DataFrame(
+            {"macd": line, "signal": signal, "histogram": line - signal, "_fast": fast, "_slow": slow}
+        )
+    raise KeyError(name)
+
+
+def compute_indicator(name: str, bars: pd.DataFrame, params: dict) -> pd.DataFrame:
+    return _compute(name, bars, params, None)
+
+
+def extend_indicator(
+    name: str, bars: pd.DataFrame, params: dict, previous: pd.DataFrame
+) -> Optional[pd.DataFrame]:
+    # recompute from the last memoized bar on (it may have been still forming);
+    # returns None when the memoized rows no longer line up with `bars`
+    if len(previous) < 2:
+        return None
+    kept = previous.iloc[:-1]
+    position = bars.index.searchsorted(kept.index[-1])
+    if position >= len(bars) or bars.index[position] != kept.index[-1]:
+        return None
+    tail_start = position + 1
+    if name in _STATE_COLUMNS or name == "ema":
+        state = kept.iloc[-1].copy()
+        state["_close"] = float(bars["Close"].iloc[position])
+        tail = _compute(name, bars.iloc[tail_start:], params, state)
+    else:
+        lookback = int(params["window"]) - 1
+        window = bars.iloc[max(0, tail_start - lookback) :]
+        tail = _compute(name, window, params, None).iloc[tail_start - max(0, tail_start - lookback) :]
+    result = pd.concat([kept, tail])
+    result = result.iloc[result.index.searchsorted(bars.index[0]) :]
+    if len(result) != len(bars):
+        return None
+    return result
+
+
+class IndicatorEngine:
+    # memoizes per (symbol, interval, indicator, params); a hit on the same last
+    # bar is free and newer bars only extend the stored result
+    def __init__(self, max_entries: int = MAX_MEMOIZED_SERIES):
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.extended = 0
+        self.computed = 0
+
+    def get(self, key: Tuple, name: str, bars: pd.DataFrame, params: dict) -> pd.DataFrame:
+        memo_key = (key, name, tuple(sorted(params.items())))
+        # the last bar's values are part of the check since a forming bar changes in place
+        last_bar = (bars.index[-1], tuple(bars.iloc[-1])) if len(bars) else None
+        previous, previous_last_bar = self._memo.get(memo_key, (None, None))
+        result = None
+        if previous is not None and len(bars) and len(previous):
+            if previous_last_bar == last_bar and len(previous) == len(bars):
+                self.hits += 1
+                result = previous
+            else:
+                result = extend_indicator(name, bars, params, previous)
+                if result is not None:
+                    self.extended += 1
+        if result is None:
+            self.computed += 1
+            result = compute_indicator(name, bars, params)
+        self._memo[memo_key] = (result, last_bar)
+        self._memo.move_to_end(memo_key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+        return result.drop(columns=_STATE_COLUMNS.get(name, []))
+
+    def stats(self) -> dict:
+        return {
+            "memoized": len(self._memo),
+            "hits": self.hits,
+            "extended": self.extended,
+            "computed": self.computed,
+        }
+
+
+indicator_engine = IndicatorEngine()
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    return indicator_engine
@@ -0,0 +1,346 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from database.database import (
+    get_current_stocks_collection,
+    get_position_snapshot_collection,
+    get_purchase_collection,
+    get_sold_collection,
+)
+
+# a snapshot is written once this many events were replayed past the previous one
+SNAPSHOT_EVERY = int(os.getenv("POSITION_SNAPSHOT_EVERY", "100"))
+# a trade's _id is taken on the client before its insert commits, so a smaller id
+# can become visible after a larger one was read; readers that resume from an id
+# re-read this far back, and snapshots never cover events inside the window
+TRADE_COMMIT_LAG = timedelta(seconds=int(os.getenv("TRADE_COMMIT_LAG_SECONDS", "60")))
+# below this log-scale the cost recurrence is replayed event by event instead
+_MIN_LOG_SCALE = -600.0
+_EVENT_COLUMNS = ["symbol", "_id", "side", "quantity", "price", "name", "created_at"]
+
+
+async def load_events(
+    purchases: AsyncCollection,
+    solds: AsyncCollection,
+    owner: str,
+    symbols: Optional[Iterable[str]] = None,
+    after: Optional[Dict[str, ObjectId]] = None,
+) -> pd.DataFrame:
+    # buyed_stocks and sold_stocks read as one log ordered by insertion (_id);
+    # events at or before a symbol's snapshot are dropped
+    query = {"owner": owner}
+    if symbols is not None:
+        query["symbol"] = {"$in": list(symbols)}
+    after = after or {}
+    if after and symbols is not None and set(query["symbol"]["$in"]) <= set(after):
+        # every requested symbol has a snapshot, so older events never need reading
+        query["_id"] = {"$gt": min(after.values())}
+    buys, sells = await asyncio.gather(
+        purchases.find(
+            query, {"symbol": 1, "quantity": 1, "price_per_unit": 1, "name": 1, "created_at": 1}
+        ).to_list(None),
+        solds.find(query, {"symbol": 1, "quantity": 1, "price_per_unit_sold": 1}).to_list(None),
+    )
+    rows = [
+        (b["symbol"], b["_id"], 1, b["quantity"], b["price_per_unit"], b.get("name"), b.get("created_at"))
+        for b in buys
+    ]
+    rows.extend(
+        (s["symbol"], s["_id"], -1, s["quantity"], s["price_per_unit_sold"], None, None)
+        for s in sells
+    )
+    events = pd.DataFrame(rows, columns=_EVENT_COLUMNS)
+    if after and len(events):
+        keep = [
+            symbol not in after or event_id > after[symbol]
+            for symbol, event_id in zip(events["symbol"], events["_id"])
+        ]
+        events = events[np.array(keep, dtype=bool)]
+    events["order"] = [event_id.binary for event_id in events["_id"]]
+    return events.sort_values(["symbol", "order"], kind="stable").reset_index(drop=True)
+
+
+def _replay_symbol_loop(quantity, price, side, start_quantity, start_cost, start_average):
+    # reference recurrence, used when the vectorized form would lose precision
+    held, cost, average = start_quantity, start_cost, start_average
+    for q, p, s in zip(quantity, price, side):
+        if s > 0:
+            cost += p * q
+            held += q
+        else:
+            remaining = max(held - q, 0.0)
+            cost = cost * remaining / held if held > 0 else 0.0
+            held -= q
+        if held > 0:
+            average = cost / held
+    return cost, average
+
+
+def replay(events: pd.DataFrame, snapshots: Optional[Dict[str, dict]] = None) -> pd.DataFrame:
+    # rebuilds every symbol in one pass: quantity and net profit are grouped
+    # cumulative sums, and the cost basis follows C[k] = m[k] * C[k-1] + a[k]
+    # (buys add p*q, sells scale by remaining/held) solved per segment between
+    # sell-outs as C = P * (C0 + cumsum(a / P)) with P the running product of m
+    snapshots = snapshots or {}
+    columns = ["symbol", "quantity", "price_per_unit", "cost", "net_profit", "name", "created_at", "last_event_id", "events"]
+    symbols = sorted(set(events["symbol"]) | set(snapshots))
+    if not symbols:
+        return pd.DataFrame(columns=columns)
+    base = pd.DataFrame(
+        [
+            {
+                "symbol": symbol,
+                "quantity0": float(snapshots.get(symbol, {}).get("quantity", 0)),
+                "cost0": float(snapshots.get(symbol, {}).get("cost", 0.0)),
+                "average0": float(snapshots.get(symbol, {}).get("price_per_unit", 0.0)),
+                "net0": float(snapshots.get(symbol, {}).get("net_profit", 0.0)),
+            }
+            for symbol in symbols
+        ]
+    ).set_index("symbol")
+    result = base.copy()
+    result["quantity"] = result["quantity0"]
+    result["cost"] = result["cost0"]
+    result["price_per_unit"] = result["average0"]
+    result["net_profit"] = result["net0"]
+    result["name"] = [snapshots.get(s, {}).get("name") for s in symbols]
+    result["created_at"] = [snapshots.get(s, {}).get("created_at") for s in symbols]
+    result["last_event_id"] = [snapshots.get(s, {}).get("last_event_id") for s in symbols]
+    result["events"] = 0
+
+    if len(events):
+        symbol = events["symbol"].to_numpy()
+        side = events["side"].to_numpy(dtype=float)
+        quantity = events["quantity"].to_numpy(dtype=float)
+        price = events["price"].to_numpy(dtype=float)
+        grouped = events.groupby("symbol", sort=False)
+        quantity0 = base.loc[symbol, "quantity0"].to_numpy()
+        cost0 = base.loc[symbol, "cost0"].to_numpy()
+
+        held = quantity0 + pd.Series(side * quantity).groupby(symbol).cumsum().to_numpy()
+        held_before = held - side * quantity
+        cash = pd.Series(-side * price * quantity).groupby(symbol).cumsum().to_numpy()
+
+        is_sell = side < 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factor = np.where(
+                is_sell,
+                np.where(held_before > 0, np.clip(held, 0, None) / held_before, 0.0),
+                1.0,
+            )
+        added = np.where(is_sell, 0.0, price * quantity)
+        first = np.r_[True, symbol[1:] != symbol[:-1]]
+        sold_out = factor == 0
+        # a new segment starts at each symbol's first event and right after a sell-out
+        starts = first | np.r_[False, sold_out[:-1]]
+        segment = np.cumsum(starts)
+        log_factor = np.log(np.where(sold_out, 1.0, factor))
+        log_scale = pd.Series(log_factor).groupby(segment).cumsum().to_numpy()
+        segment_cost0 = np.where(first, cost0, 0.0)
+        start_cost = pd.Series(segment_cost0).groupby(segment).transform("first").to_numpy()
+        with np.errstate(over="ignore", under="ignore", invalid="ignore"):
+            scaled = pd.Series(added * np.exp(-log_scale)).groupby(segment).cumsum().to_numpy()
+            cost = np.exp(log_scale) * (start_cost + scaled)
+        cost = np.where(sold_out, 0.0, cost)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(held > 0, cost / np.where(held > 0, held, 1), np.nan)
+
+        last = np.r_[symbol[1:] != symbol[:-1], True]
+        tail = pd.DataFrame(
+            {
+                "quantity": held[last],
+                "cost": cost[last],
+                "net_profit": base.loc[symbol[last], "net0"].to_numpy() + cash[last],
+                "last_event_id": events["_id"].to_numpy()[last],
+                "events": grouped.size().loc[symbol[last]].to_numpy(),
+            },
+            index=symbol[last],
+        )
+        averages = pd.Series(average).groupby(symbol).last()
+        tail["price_per_unit"] = averages.reindex(tail.index).fillna(base["average0"]).to_numpy()
+        buys = events[events["side"] > 0]
+        names = buys.groupby("symbol")["name"].last()
+        created = events.groupby("symbol")["created_at"].first()
+
+        unstable = pd.Series(log_scale).groupby(symbol).min() < _MIN_LOG_SCALE
+        for unstable_symbol in unstable[unstable].index:
+            rows = events["symbol"] == unstable_symbol
+            tail.loc[unstable_symbol, ["cost", "price_per_unit"]] = _replay_symbol_loop(
+                quantity[rows],
+                price[rows],
+                side[rows],
+                base.at[unstable_symbol, "quantity0"],
+                base.at[unstable_symbol, "cost0"],
+                base.at[unstable_symbol, "average0"],
+            )
+
+        for column in ["quantity", "cost", "price_per_unit", "net_profit", "last_event_id", "events"]:
+            result.loc[tail.index, column] = tail[column]
+        result.loc[names.index, "name"] = names.where(names.notna(), result.loc[names.index, "name"])
+        missing_created = result.loc[created.index, "created_at"].isna()
+        result.loc[created.index[missing_created.to_numpy()], "created_at"] = created[missing_created.to_numpy()]
+
+    result["quantity"] = result["quantity"].round().astype(int)
+    return result.reset_index(names="symbol")[columns]
+
+
+class PositionLedger:
+    def __init__(
+        self,
+        purchases: AsyncCollection,
+        solds: AsyncCollection,
+        positions: AsyncCollection,
+        snapshots: AsyncCollection,
+    ):
+        self.purchases = purchases
+        self.solds = solds
+        self.positions = positions
+        self.snapshots = snapshots
+
+    async def _load_snapshots(self, owner: str, symbols: Optional[List[str]]) -> Dict[str, dict]:
+        query = {"owner": owner}
+        if symbols is not None:
+            query["symbol"] = {"$in": symbols}
+        return {snapshot["symbol"]: snapshot async for snapshot in self.snapshots.find(query, {"_id": 0})}
+
+    async def rebuild(self, owner: str, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        snapshots = await self._load_snapshots(owner, symbols)
+        after = {symbol: snap["last_event_id"] for symbol, snap in snapshots.items()}
+        events = await load_events(self.purchases, self.solds, owner, symbols, after)
+        positions = replay(events, snapshots)
+        if (positions["events"] >= SNAPSHOT_EVERY).any():
+            # a snapshot stops at the lag horizon so a late insert is never behind it
+            horizon = ObjectId.from_datetime(datetime.now(timezone.utc) - TRADE_COMMIT_LAG).binary
+            settled = replay(events[events["order"] < horizon], snapshots)
+            due = settled[settled["events"] >= SNAPSHOT_EVERY]
+        else:
+            due = positions.iloc[:0]
+        if len(due):
+            await self.snapshots.bulk_write(
+                [
+                    UpdateOne(
+                        {"owner": owner, "symbol": row.symbol},
+                        {
+                            "$set": {
+                                "quantity": int(row.quantity),
+                                "cost": float(row.cost),
+                                "price_per_unit": float(row.price_per_unit),
+                                "net_profit": float(row.net_profit),
+                                "name": row.name,
+                                "created_at": row.created_at,
+                                "last_event_id": row.last_event_id,
+                                "taken_at": datetime.now(),
+                            }
+                        },
+                        upsert=True,
+                    )
+                    for row in due.itertuples(index=False)
+                ],
+                ordered=False,
+            )
+        return positions
+
+    async def invalidate(self, owner: str, symbols: Iterable[str]) -> None:
+        # an edited or deleted event may sit before the snapshot, so replay from scratch
+        await self.snapshots.delete_many({"owner": owner, "symbol": {"$in": list(symbols)}})
+
+    async def write_positions(self, owner: str, positions: pd.DataFrame) -> int:
+        if not len(positions):
+            return 0
+        now = datetime.now()
+        result = await self.positions.bulk_write(
+            [
+                UpdateOne(
+                    {"owner": owner, "symbol": row.symbol},
+                    {
+                        "$set": {
+                            "quantity": int(row.quantity),
+                            "price_per_unit": float(row.price_per_unit),
+                            "net_profit": float(row.net_profit),
+                            "name": row.name,
+                            "last_updated": now,
+                        },
+                        "$setOnInsert": {"created_at": row.created_at or now},
+                    },
+                    upsert=True,
+                )
+                for row in positions.itertuples(index=False)
+            ],
+            ordered=False,
+        )
+        return result.modified_count + result.upserted_count
+
+    async def sync(self, owner: str, symbols: List[str]) -> pd.DataFrame:
+        # replaces the forward/reverse arithmetic after a ledger edit
+        await self.invalidate(owner, symbols)
+        positions = await self.rebuild(owner, symbols)
+        await self.write_positions(owner, positions)
+        # a symbol whose last event was deleted no longer has a position
+        emptied = sorted(set(symbols) - set(positions["symbol"]))
+        if emptied:
+            await self.positions.delete_many({"owner": owner, "symbol": {"$in": emptied}})
+        return positions
+
+    async def verify(self, owner: str, repair: bool = False, tolerance: float = 1e-6) -> dict:
+        rebuilt = (await self.rebuild(owner)).set_index("symbol")
+        stored = pd.DataFrame(
+            await self.positions.find(
+                {"owner": owner},
+                {"_id": 0, "symbol": 1, "quantity": 1, "price_per_unit": 1, "net_profit": 1},
+            ).to_list(None),
+            columns=["symbol", "quantity", "price_per_unit", "net_profit"],
+        ).set_index("symbol")
+        joined = rebuilt.join(stored, how="left", rsuffix="_stored")
+        drift = (
+            joined["quantity_stored"].isna()
+            | (joined["quantity"] != joined["quantity_stored"])
+            | ~np.isclose(joined["price_per_unit"], joined["price_per_unit_stored"].astype(float), rtol=tolerance, atol=tolerance)
+            | ~np.isclose(joined["net_profit"], joined["net_profit_stored"].astype(float), rtol=tolerance, atol=tolerance)
+        )
+        mismatched = joined[drift]
+        orphaned = sorted(set(stored.index) - set(rebuilt.index))
+        repaired = 0
+        if repair and len(mismatched):
+            repaired = await self.write_positions(owner, rebuilt.loc[mismatched.index].reset_index())
+        if repair and orphaned:
+            deleted = await self.positions.delete_many({"owner": owner, "symbol": {"$in": orphaned}})
+            repaired += deleted.deleted_count
+        return {
+            "owner": owner,
+            "positions": int(len(rebuilt)),
+            "mismatched": [
+                {
+                    "symbol": symbol,
+                    "expected": {
+                        "quantity": int(row.quantity),
+                        "price_per_unit": float(row.price_per_unit),
+                        "net_profit": float(row.net_profit),
+                    },
+                    "stored": None
+                    if pd.isna(row.quantity_stored)
+                    else {
+                        "quantity": row.quantity_stored,
+                        "price_per_unit": row.price_per_unit_stored,
+                        "net_profit": row.net_profit_stored,
+                    },
+                }
+                for symbol, row in mismatched.iterrows()
+            ],
+            "orphaned": orphaned,
+            "repaired": repaired,
+        }
+
+
+def get_position_ledger() -> PositionLedger:
+    return PositionLedger(
+        get_purchase_collection(),
+        get_sold_collection(),
+        get_current_stocks_collection(),
+        get_position_snapshot_collection(),
+    )
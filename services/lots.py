@@ -0,0 +1,251 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from pymongo.asynchronous.collection import AsyncCollection
+from services.ledger import TRADE_COMMIT_LAG
+
+PNL_MODES = ("fifo", "average")
+PNL_PERIODS = {"day": "D", "week": "W", "month": "M", "year": "Y"}
+# owners whose lot books stay in memory between requests
+PNL_CACHE_OWNERS = 256
+
+
+class LotBook:
+    # open lots of one (owner, symbol) as parallel arrays; sells consume from
+    # `head` so FIFO matching never shifts memory until the dead prefix is large
+    __slots__ = ("quantity", "price", "head", "size")
+
+    def __init__(self, capacity: int = 8):
+        self.quantity = np.zeros(capacity)
+        self.price = np.zeros(capacity)
+        self.head = 0
+        self.size = 0
+
+    def _compact(self) -> None:
+        live = self.size - self.head
+        capacity = max(8, live * 2)
+        quantity, price = np.zeros(capacity), np.zeros(capacity)
+        quantity[:live] = self.quantity[self.head : self.size]
+        price[:live] = self.price[self.head : self.size]
+        self.quantity, self.price, self.head, self.size = quantity, price, 0, live
+
+    def buy(self, quantity: float, price: float) -> None:
+        if self.size == len(self.quantity):
+            self._compact()
+        self.quantity[self.size] = quantity
+        self.price[self.size] = price
+        self.size += 1
+
+    def sell(self, quantity: float, price: float, mode: str) -> float:
+        # returns the realized P&L of the matched part; an oversell past the
+        # open lots is ignored, as the ledger never lets one through
+        if self.head == self.size:
+            return 0.0
+        if mode == "average":
+            return self._sell_average(quantity, price)
+        first = self.quantity[self.head]
+        if quantity < first:
+            self.quantity[self.head] = first - quantity
+            return quantity * (price - self.price[self.head])
+        open_quantity = self.quantity[self.head : self.size]
+        consumed = np.cumsum(open_quantity)
+        full = int(np.searchsorted(consumed, quantity, side="right"))
+        matched = min(quantity, consumed[-1])
+        cost = float(np.dot(open_quantity[:full], self.price[self.head : self.head + full]))
+        if full < len(open_quantity):
+            partial = matched - (consumed[full - 1] if full else 0.0)
+            cost += partial * self.price[self.head + full]
+            self.quantity[self.head + full] -= partial
+        self.head += full
+        if self.head * 2 > len(self.quantity):
+            self._compact()
+        return matched * price - cost
+
+    def _sell_average(self, quantity: float, price: float) -> float:
+        # average mode keeps a single merged lot
+        if self.size - self.head > 1:
+            self._merge()
+        held = self.quantity[self.head]
+        matched = min(quantity, held)
+        realized = matched * (price - self.price[self.head])
+        self.quantity[self.head] = held - matched
+        if self.quantity[self.head] == 0:
+            self.head = self.size = 0
+        return realized
+
+    def _merge(self) -> None:
+        quantity = self.quantity[self.head : self.size]
+        total = quantity.sum()
+        average = float(np.dot(quantity, self.price[self.head : self.size]) / total)
+        self.quantity[0], self.price[0] = total, average
+        self.head, self.size = 0, 1
+
+    def open_quantity(self) -> float:
+        return float(self.quantity[self.head : self.size].sum())
+
+    def open_cost(self) -> float:
+        return float(np.dot(self.quantity[self.head : self.size], self.price[self.head : self.size]))
+
+
+class OwnerPnl:
+    def __init__(self, mode: str):
+        self.mode = mode
+        # held while catching up so concurrent requests never apply a trade twice
+        self.lock = asyncio.Lock()
+        # -1 is never a stored revision, so the first request always replays
+        self.reset(-1)
+
+    def reset(self, revision: int) -> None:
+        # `revision` is the owner's shared edit counter the book was built at
+        self.revision = revision
+        self.last_id: Optional[ObjectId] = None
+        # ids applied inside the lag window behind last_id, skipped when re-read
+        self.recent: Dict[ObjectId, None] = {}
+        self.books: Dict[str, LotBook] = {}
+        self.realized: Dict[str, float] = {}
+        # one entry per sell, kept as lists so appends stay O(1)
+        self.sell_symbols: List[str] = []
+        self.sell_times: List[datetime] = []
+        self.sell_realized: List[float] = []
+
+    def catch_up_from(self) -> Optional[ObjectId]:
+        if self.last_id is None:
+            return None
+        return ObjectId.from_datetime(self.last_id.generation_time - TRADE_COMMIT_LAG)
+
+    def apply(self, trades: List[tuple]) -> None:
+        for event_id, symbol, side, quantity, price, when in trades:
+            book = self.books.get(symbol)
+            if book is None:
+                book = self.books[symbol] = LotBook()
+                self.realized[symbol] = 0.0
+            if side > 0:
+                book.buy(quantity, price)
+            else:
+                realized = book.sell(quantity, price, self.mode)
+                self.realized[symbol] += realized
+                self.sell_symbols.append(symbol)
+                self.sell_times.append(when or event_id.generation_time.replace(tzinfo=None))
+                self.sell_realized.append(realized)
+            self.last_id = event_id
+            self.recent[event_id] = None
+        if trades:
+            start = self.catch_up_from()
+            self.recent = {event_id: None for event_id in self.recent if event_id >= start}
+
+
+async def load_trades(
+    purchases: AsyncCollection, solds: AsyncCollection, owner: str, since: Optional[ObjectId]
+) -> List[tuple]:
+    # only events from `since` on are read, so a warm book costs one indexed
+    # range query per collection
+    query = {"owner": owner}
+    if since is not None:
+        query["_id"] = {"$gte": since}
+    buys, sells = await asyncio.gather(
+        purchases.find(query, {"symbol": 1, "quantity": 1, "price_per_unit": 1, "timestamp": 1}).to_list(None),
+        solds.find(query, {"symbol": 1, "quantity": 1, "price_per_unit_sold": 1, "timestamp": 1}).to_list(None),
+    )
+    trades = [
+        (b["_id"], b["symbol"], 1, float(b["quantity"]), float(b["price_per_unit"]), b.get("timestamp"))
+        for b in buys
+    ]
+    trades.extend(
+        (s["_id"], s["symbol"], -1, float(s["quantity"]), float(s["price_per_unit_sold"]), s.get("timestamp"))
+        for s in sells
+    )
+    trades.sort(key=lambda trade: trade[0].binary)
+    return trades
+
+
+async def trade_revision(revisions: AsyncCollection, owner: str) -> int:
+    found = await revisions.find_one({"owner": owner}, {"_id": 0, "revision": 1})
+    return found["revision"] if found else 0
+
+
+class PnlEngine:
+    def __init__(self, max_owners: int = PNL_CACHE_OWNERS):
+        self.max_owners = max_owners
+        self._owners: "OrderedDict[Tuple[str, str], OwnerPnl]" = OrderedDict()
+        self.applied = 0
+        self.rebuilds = 0
+
+    async def get(
+        self,
+        owner: str,
+        mode: str,
+        purchases: AsyncCollection,
+        solds: AsyncCollection,
+        revisions: AsyncCollection,
+    ) -> OwnerPnl:
+        key = (owner, mode)
+        pnl = self._owners.get(key)
+        if pnl is None:
+            pnl = self._owners[key] = OwnerPnl(mode)
+            if len(self._owners) > self.max_owners:
+                self._owners.popitem(last=False)
+        else:
+            self._owners.move_to_end(key)
+        async with pnl.lock:
+            # books catch up on read rather than on each insert: another worker's
+            # trades only show up here, and a book applied ahead of trades it never
+            # read would skip them. The revision check rides along with the read
+            revision, trades = await asyncio.gather(
+                trade_revision(revisions, owner),
+                load_trades(purchases, solds, owner, pnl.catch_up_from()),
+            )
+            if revision != pnl.revision:
+                # new here, or another worker edited or deleted a trade
+                if pnl.last_id is not None:
+                    trades = await load_trades(purchases, solds, owner, None)
+                pnl.reset(revision)
+                self.rebuilds += 1
+            # the lag window is re-read every time; a trade seen for the first time
+            # behind last_id committed late, and lots cannot be unwound, so replay
+            trades = [trade for trade in trades if trade[0] not in pnl.recent]
+            if trades and pnl.last_id is not None and trades[0][0] < pnl.last_id:
+                pnl.reset(revision)
+                self.rebuilds += 1
+                trades = await load_trades(purchases, solds, owner, None)
+            pnl.apply(trades)
+        self.applied += len(trades)
+        return pnl
+
+    async def forget(self, owner: str, revisions: AsyncCollection) -> None:
+        # edits and deletes rewrite history; bumping the shared revision makes
+        # every worker replay it all on its next request, not just this one
+        await revisions.update_one({"owner": owner}, {"$inc": {"revision": 1}}, upsert=True)
+        for mode in PNL_MODES:
+            self._owners.pop((owner, mode), None)
+
+    def stats(self) -> dict:
+        return {"owners": len(self._owners), "applied": self.applied, "rebuilds": self.rebuilds}
+
+
+def realized_by_period(
+    pnl: OwnerPnl, period: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> List[dict]:
+    if not pnl.sell_realized:
+        return []
+    realized = pd.Series(pnl.sell_realized, index=pd.DatetimeIndex(pnl.sell_times))
+    if start is not None:
+        realized = realized[realized.index >= pd.Timestamp(start)]
+    if end is not None:
+        realized = realized[realized.index < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    grouped = realized.groupby(realized.index.to_period(PNL_PERIODS[period]))
+    totals = pd.DataFrame({"realized_pnl": grouped.sum(), "sells": grouped.size()})
+    return [
+        {"period": str(label), "realized_pnl": round(float(row.realized_pnl), 2), "sells": int(row.sells)}
+        for label, row in totals.iterrows()
+    ]
+
+
+pnl_engine = PnlEngine()
+
+
+def get_pnl_engine() -> PnlEngine:
+    return pnl_engine
@@ -0,0 +1,234 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+import yfinance as yf
+from fastapi import HTTPException, status
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def normalize_bars(data: Optional[pd.DataFrame]) -> pd.DataFrame:
+    # yfinance returns a (field, ticker) MultiIndex on newer releases and a
+    # tz-aware index for intraday bars; keep flat columns and naive exchange time
+    if data is None or data.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    df = pd.DataFrame(data)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df = df[[column for column in BAR_COLUMNS if column in df.columns]]
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.rename("Date")
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df
+
+
+def slice_bars(
+    df: pd.DataFrame, start: Optional[date] = None, end: Optional[date] = None
+) -> pd.DataFrame:
+    # binary search on the sorted index; `end` is inclusive of the whole day
+    index = df.index
+    lower = index.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    upper = (
+        index.searchsorted(pd.Timestamp(end) + pd.Timedelta(days=1))
+        if end is not None
+        else len(index)
+    )
+    return df.iloc[lower:upper]
+
+
+class MarketDataProvider(ABC):
+    @abstractmethod
+    def fetch(
+        self,
+        symbol: str,
+        interval: str = "1d",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None,
+    ) -> pd.DataFrame:
+        ...
+
+    def fetch_many(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        return {
+            symbol: self.fetch(symbol, interval=interval, start=start, end=end, period=period)
+            for symbol in symbols
+        }
+
+
+def _download_range(start, end, period) -> dict:
+    if start is None and period is not None:
+        return {"period": period}
+    return {"start": start, "end": end}
+
+
+class YFinanceProvider(MarketDataProvider):
+    def fetch(self, symbol, interval="1d", start=None, end=None, period=None):
+        data = yf.download(
+            symbol, interval=interval, progress=False, **_download_range(start, end, period)
+        )
+        return normalize_bars(data)
+
+    def fetch_many(self, symbols, interval="1d", start=None, end=None, period=None):
+        # one grouped multi-ticker request instead of one download per symbol
+        symbols = list(symbols)
+        if len(symbols) < 2:
+            return super().fetch_many(symbols, interval, start, end, period)
+        data = yf.download(
+            symbols,
+            interval=interval,
+            group_by="ticker",
+            threads=True,
+            progress=False,
+            **_download_range(start, end, period),
+        )
+        frames = {}
+        tickers = set()
+        if data is not None and isinstance(data.columns, pd.MultiIndex):
+            tickers = set(data.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol in tickers:
+                frames[symbol] = normalize_bars(data[symbol].dropna(how="all"))
+            else:
+                frames[symbol] = normalize_bars(None)
+        return frames
+
+
+class InMemoryProvider(MarketDataProvider):
+    # serves fixed frames per (symbol, interval); used in place of yfinance in tests
+    def __init__(self, frames: Optional[Dict[Tuple[str, str], pd.DataFrame]] = None):
+        self.frames = frames or {}
+        self.calls = []
+
+    def fetch(self, symbol, interval="1d", start=None, end=None, period=None):
+        self.calls.append((symbol, interval, start, end, period))
+        df = normalize_bars(self.frames.get((symbol, interval)))
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end)]
+        if start is None and period is not None and period.endswith("d") and len(df):
+            days = df.index.normalize().unique()[-int(period[:-1]):]
+            df = df[df.index.normalize().isin(days)]
+        return df
+
+
+_provider: MarketDataProvider = YFinanceProvider()
+
+
+def get_market_data_provider() -> MarketDataProvider:
+    return _provider
+
+
+def set_market_data_provider(provider: MarketDataProvider) -> None:
+    global _provider
+    _provider = provider
+
+
+class AsyncMarketDataProvider:
+    # runs blocking provider calls on a dedicated, size-bounded pool so a slow
+    # upstream never stalls the event loop serving the other routers
+    def __init__(
+        self,
+        max_workers: int = int(os.getenv("MARKET_DATA_WORKERS", "4")),
+        max_pending: int = int(os.getenv("MARKET_DATA_MAX_PENDING", "32")),
+        timeout: float = float(os.getenv("MARKET_DATA_TIMEOUT", "20")),
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="market-data"
+        )
+
+    def _release(self, _future) -> None:
+        self.pending -= 1
+
+    async def run(self, func: Callable, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Market data service is busy, try again shortly",
+            )
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+        # the slot stays taken until the worker really finishes, even after a timeout
+        self.pending += 1
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Market data provider timed out",
+            )
+
+    async def fetch(
+        self,
+        symbol: str,
+        interval: str = "1d",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None,
+    ) -> pd.DataFrame:
+        return await self.run(
+            get_market_data_provider().fetch,
+            symbol,
+            interval=interval,
+            start=start,
+            end=end,
+            period=period,
+        )
+
+    async def fetch_many(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        return await self.run(
+            get_market_data_provider().fetch_many,
+            symbols,
+            interval=interval,
+            start=start,
+            end=end,
+            period=period,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async_market_data = AsyncMarketDataProvider()
+
+
+def get_async_market_data() -> AsyncMarketDataProvider:
+    return async_market_data
@@ -0,0 +1,207 @@
+import base64
+import binascii
+from functools import partial
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pymongo import ASCENDING, DESCENDING
+from pymongo.asynchronous.collection import AsyncCollection
+from services.fields import projection, shape
+from services.serializers import NDJSON_MEDIA_TYPE
+
+PAGE_DEFAULT_LIMIT = 100
+PAGE_MAX_LIMIT = 1000
+# streamed pages hold one batch in memory at a time, so they may be much longer
+STREAM_MAX_LIMIT = 100_000
+STREAM_BATCH_ROWS = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# keyset columns per list; each ends in a field unique per owner so pages never overlap
+CREATED_KEYS = ("created_at", "_id")
+ID_KEYS = ("_id",)
+SYMBOL_KEYS = ("symbol",)
+_DECODERS = {"created_at": datetime.fromisoformat, "_id": ObjectId, "symbol": str}
+# legacy documents may lack these; Mongo sorts null and missing below every
+# value, so such rows come first ascending and last descending, ordered by _id
+NULLABLE_KEYS = frozenset(("created_at",))
+
+
+def _encode_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(order: str, keys: Tuple[str, ...], document: dict) -> str:
+    payload = orjson.dumps([order, [_encode_value(document.get(key)) for key in keys]])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, order: str, keys: Tuple[str, ...]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_order, values = orjson.loads(base64.urlsafe_b64decode(padded))
+        if cursor_order != order or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [
+            None if value is None and key in NULLABLE_KEYS else _DECODERS[key](value)
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, TypeError, InvalidId, binascii.Error, orjson.JSONDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _past(key: str, value, order: str) -> Optional[dict]:
+    # rows strictly after `value` in `order`; None when there are none
+    if key not in NULLABLE_KEYS:
+        return {key: {"$gt" if order == "asc" else "$lt": value}}
+    # comparisons never match null, so null rows are placed by hand
+    if value is None:
+        return {key: {"$ne": None}} if order == "asc" else None
+    if order == "asc":
+        return {key: {"$gt": value}}
+    return {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+
+def keyset_filter(keys: Tuple[str, ...], values: list, order: str) -> dict:
+    # (a, b) > (x, y)  <=>  a > x  or  (a == x and b > y)
+    branches = []
+    for i, key in enumerate(keys):
+        past = _past(key, values[i], order)
+        if past is not None:
+            branches.append({**{keys[j]: values[j] for j in range(i)}, **past})
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def through_filter(keys: Tuple[str, ...], values: list, order: str) -> dict:
+    # rows up to and including `values` in `order`; keys are unique per owner
+    before = keyset_filter(keys, values, "desc" if order == "asc" else "asc")
+    return {"$or": [before, dict(zip(keys, values))]}
+
+
+class Pagination:
+    # list dependency: `limit`, `after` and `order` query parameters; the cursor
+    # for the following page goes out in X-Next-Cursor and a Link rel="next".
+    # `stream=true` or `Accept: application/x-ndjson` writes the page batch by batch
+    def __init__(
+        self,
+        request: Request,
+        limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=STREAM_MAX_LIMIT),
+        after: Optional[str] = None,
+        order: str = Query("asc", pattern="^(asc|desc)$"),
+        stream: bool = False,
+    ):
+        self.request = request
+        # Accept picks the body format, so caches must key on it
+        self.headers = {"Vary": "Accept"}
+        self.limit = limit
+        self.after = after
+        self.order = order
+        self.ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+        self.stream = stream or self.ndjson
+        if limit > PAGE_MAX_LIMIT and not self.stream:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="limit above %d needs stream=true or NDJSON" % PAGE_MAX_LIMIT,
+            )
+
+    def _query(self, query: dict, keys: Tuple[str, ...]) -> dict:
+        if self.after:
+            query = {**query, **keyset_filter(keys, decode_cursor(self.after, self.order, keys), self.order)}
+        return query
+
+    def _sort(self, keys: Tuple[str, ...]) -> list:
+        direction = ASCENDING if self.order == "asc" else DESCENDING
+        return [(key, direction) for key in keys]
+
+    def _next_headers(self, keys: Tuple[str, ...], last: dict) -> dict:
+        cursor = encode_cursor(self.order, keys, last)
+        next_url = self.request.url.include_query_params(after=cursor)
+        return {NEXT_CURSOR_HEADER: cursor, "Link": '<%s>; rel="next"' % next_url}
+
+    async def fetch(
+        self,
+        collection: AsyncCollection,
+        query: dict,
+        keys: Tuple[str, ...],
+        projection: Optional[dict] = None,
+    ) -> List[dict]:
+        if projection is not None:
+            # the cursor is built from the last row, so its keys are always read
+            projection = {**projection, **{key: 1 for key in keys}}
+        # one extra row tells whether another page exists without a count
+        documents = await (
+            collection.find(self._query(query, keys), projection)
+            .sort(self._sort(keys))
+            .limit(self.limit + 1)
+            .to_list(None)
+        )
+        if len(documents) > self.limit:
+            documents = documents[: self.limit]
+            self.headers.update(self._next_headers(keys, documents[-1]))
+        return documents
+
+    async def respond(
+        self,
+        collection: AsyncCollection,
+        query: dict,
+        keys: Tuple[str, ...],
+        selected: Tuple[str, ...],
+    ) -> Response:
+        # documents come from our own collections, so rows are shaped straight into
+        # dicts and rendered by orjson instead of being validated by response_model
+        if not self.stream:
+            documents = await self.fetch(collection, query, keys, projection(selected))
+            return ORJSONResponse(shape(documents, selected), headers=self.headers)
+        build = partial(shape, selected=selected)
+        return await self._streaming(collection, query, keys, projection(selected), build)
+
+    async def _streaming(
+        self,
+        collection: AsyncCollection,
+        query: dict,
+        keys: Tuple[str, ...],
+        projection: Optional[dict],
+        build: Callable[[List[dict]], list],
+    ) -> StreamingResponse:
+        query, sort = self._query(query, keys), self._sort(keys)
+        # headers go out before the body, so the page's last key comes from a
+        # probe that reads only index keys; the body is then bounded by it
+        probe = {key: 1 for key in keys}
+        if "_id" not in keys:
+            probe["_id"] = 0
+        edge = await collection.find(query, probe).sort(sort).skip(self.limit - 1).limit(2).to_list(None)
+        if len(edge) > 1:
+            self.headers.update(self._next_headers(keys, edge[0]))
+            query = {"$and": [query, through_filter(keys, [edge[0].get(key) for key in keys], self.order)]}
+        cursor = collection.find(query, projection).sort(sort).batch_size(STREAM_BATCH_ROWS)
+        if len(edge) < 2:
+            cursor = cursor.limit(self.limit)
+        media_type = NDJSON_MEDIA_TYPE if self.ndjson else "application/json"
+        return StreamingResponse(self._chunks(cursor, build), media_type=media_type, headers=self.headers)
+
+    async def _chunks(self, cursor, build: Callable[[List[dict]], list]) -> AsyncIterator[bytes]:
+        written = False
+        if not self.ndjson:
+            yield b"["
+        batch = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) == STREAM_BATCH_ROWS:
+                yield self._encode(build(batch), written)
+                written, batch = True, []
+        if batch:
+            yield self._encode(build(batch), written)
+        if not self.ndjson:
+            yield b"]"
+
+    def _encode(self, rows: List[dict], written: bool) -> bytes:
+        if self.ndjson:
+            return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+        # array elements without the brackets, comma-joined onto earlier batches
+        return (b"," if written else b"") + orjson.dumps(rows)[1:-1]
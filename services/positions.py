@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.asynchronous.collection import AsyncCollection
+
+
+def _field(name: str, default=0):
+    return {"$ifNull": ["$" + name, default]}
+
+
+def buy_position_update(quantity: int, price_per_unit: float, name: Optional[str], now: datetime) -> list:
+    # aggregation-pipeline update; every expression reads the pre-update document,
+    # so the weighted average and the new quantity are computed in one pass
+    cost = float(price_per_unit) * float(quantity)
+    total_quantity = {"$add": [_field("quantity"), quantity]}
+    return [
+        {
+            "$set": {
+                "name": _field("name", {"$literal": name}),
+                "created_at": _field("created_at", now),
+                "price_per_unit": {
+                    "$cond": [
+                        {"$gt": [total_quantity, 0]},
+                        {
+                            "$divide": [
+                                {
+                                    "$add": [
+                                        {"$multiply": [_field("price_per_unit"), _field("quantity")]},
+                                        cost,
+                                    ]
+                                },
+                                total_quantity,
+                            ]
+                        },
+                        float(price_per_unit),
+                    ]
+                },
+                "quantity": total_quantity,
+                "net_profit": {"$add": [_field("net_profit"), -cost]},
+                "last_updated": now,
+            }
+        }
+    ]
+
+
+async def apply_buy(
+    collection: AsyncCollection,
+    owner: str,
+    symbol: str,
+    name: Optional[str],
+    quantity: int,
+    price_per_unit: float,
+) -> dict:
+    # single atomic upsert on current_stocks, safe under concurrent trades
+    return await collection.find_one_and_update(
+        {"owner": owner, "symbol": symbol},
+        buy_position_update(quantity, price_per_unit, name, datetime.now()),
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def apply_sell(
+    collection: AsyncCollection,
+    owner: str,
+    symbol: str,
+    quantity: int,
+    price_per_unit_sold: float,
+) -> dict:
+    # the quantity guard sits in the filter so an oversell can never be applied
+    position = await collection.find_one_and_update(
+        {"owner": owner, "symbol": symbol, "quantity": {"$gte": quantity}},
+        {
+            "$inc": {
+                "quantity": -quantity,
+                "net_profit": float(price_per_unit_sold) * float(quantity),
+            },
+            "$set": {"last_modified_at": datetime.utcnow()},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if position is not None:
+        return position
+    # only a failed trade pays for the extra read that tells the two errors apart
+    if not await collection.find_one({"owner": owner, "symbol": symbol}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No purchase record found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Not enough stocks to sell"
+    )
+
+
+CURRENT_STOCK_FIELDS = ["symbol", "name", "price_per_unit", "quantity", "created_at", "last_updated", "net_profit", "owner"]
+PURCHASE_FIELDS = ["symbol", "name", "timestamp", "price_per_unit", "quantity", "created_at", "last_updated"]
+SOLD_FIELDS = ["symbol", "timestamp", "price_per_unit_sold", "quantity", "created_at", "last_modified_at"]
+
+
+def _history(source: AsyncCollection, match: dict, fields: List[str], limit: Optional[int], target: str) -> dict:
+    # newest `limit` trades, returned oldest first like a plain find()
+    pipeline = [{"$match": match}, {"$sort": {"_id": -1}}]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline += [
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "id": {"$toString": "$_id"}, **{field: 1 for field in fields}}},
+    ]
+    return {"$lookup": {"from": source.name, "pipeline": pipeline, "as": target}}
+
+
+def symbol_activity_pipeline(
+    owner: str,
+    symbol: str,
+    purchases: AsyncCollection,
+    solds: AsyncCollection,
+    limit: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> list:
+    # runs on current_stocks; $facet always emits one document, even without a
+    # position, so both uncorrelated $lookups ride along in the same round trip
+    match = {"owner": owner, "symbol": symbol}
+    bounds = {}
+    if start is not None:
+        bounds["$gte"] = start
+    if end is not None:
+        bounds["$lt"] = end
+    trades = {**match, "timestamp": bounds} if bounds else match
+    return [
+        {"$match": match},
+        {
+            "$facet": {
+                "current_stock": [
+                    {"$limit": 1},
+                    {"$project": {"_id": 0, **{field: 1 for field in CURRENT_STOCK_FIELDS}}},
+                ]
+            }
+        },
+        _history(solds, trades, SOLD_FIELDS, limit, "sold_records"),
+        _history(purchases, trades, PURCHASE_FIELDS, limit, "buy_stock"),
+    ]
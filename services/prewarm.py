@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import List, Optional
+from database.database import get_current_stocks_collection
+from services.bar_cache import cached_series, get_bar_cache
+from services.coalescing import SingleFlight, get_market_data_flight
+from services.market_data import AsyncMarketDataProvider, get_async_market_data
+from services.symbols import get_symbol_registry, to_ticker
+
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_INTERVAL_SECONDS = float(os.getenv("PREWARM_INTERVAL_SECONDS", "300"))
+PREWARM_RATE_PER_SECOND = float(os.getenv("PREWARM_RATE_PER_SECOND", "2"))
+PREWARM_JITTER_SECONDS = float(os.getenv("PREWARM_JITTER_SECONDS", "1"))
+
+
+async def held_tickers() -> List[str]:
+    registry = get_symbol_registry()
+    tickers = set()
+    for symbol in await get_current_stocks_collection().distinct("symbol", {"quantity": {"$gt": 0}}):
+        ticker = to_ticker(symbol)
+        if ticker in registry:
+            tickers.add(ticker)
+    return sorted(tickers)
+
+
+class PrewarmScheduler:
+    def __init__(
+        self,
+        market_data: AsyncMarketDataProvider,
+        flight: SingleFlight,
+        interval_seconds: float = PREWARM_INTERVAL_SECONDS,
+        rate_per_second: float = PREWARM_RATE_PER_SECOND,
+        jitter_seconds: float = PREWARM_JITTER_SECONDS,
+    ):
+        self.market_data = market_data
+        self.flight = flight
+        self.interval_seconds = interval_seconds
+        self.rate_per_second = rate_per_second
+        self.jitter_seconds = jitter_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.refreshed = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_batch_size = 0
+        self.last_duration = 0.0
+        self.last_lag = 0.0
+        self.last_finished_at: Optional[float] = None
+
+    async def run_once(self) -> None:
+        started = time.monotonic()
+        tickers = await held_tickers()
+        self.last_batch_size = len(tickers)
+        for ticker in tickers:
+            # fixed spacing plus jitter keeps upstream calls spread out
+            await asyncio.sleep(
+                1 / self.rate_per_second + random.uniform(0, self.jitter_seconds)
+            )
+            if self.market_data.pending * 2 >= self.market_data.max_pending:
+                self.skipped += 1
+                continue
+            try:
+                await cached_series(
+                    ticker, "5m", get_bar_cache(), self.market_data, self.flight
+                )
+                self.refreshed += 1
+            except Exception:
+                self.failures += 1
+                logger.exception("Pre-warming %s failed", ticker)
+        self.runs += 1
+        self.last_duration = time.monotonic() - started
+        self.last_finished_at = time.time()
+
+    async def run_forever(self) -> None:
+        next_run = time.monotonic() + random.uniform(0, self.jitter_seconds)
+        while True:
+            await asyncio.sleep(max(0.0, next_run - time.monotonic()))
+            self.last_lag = max(0.0, time.monotonic() - next_run)
+            try:
+                await self.run_once()
+            except Exception:
+                self.failures += 1
+                logger.exception("Pre-warming run failed")
+            next_run += self.interval_seconds
+            if next_run < time.monotonic():
+                next_run = time.monotonic()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "last_batch_size": self.last_batch_size,
+            "last_duration_seconds": round(self.last_duration, 3),
+            "scheduler_lag_seconds": round(self.last_lag, 3),
+            "last_finished_at": self.last_finished_at,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+            "skipped_busy": self.skipped,
+        }
+
+
+prewarm_scheduler = PrewarmScheduler(get_async_market_data(), get_market_data_flight())
+
+
+def get_prewarm_scheduler() -> PrewarmScheduler:
+    return prewarm_scheduler
@@ -0,0 +1,65 @@
+import time
+from typing import Dict, List, Optional
+from services.coalescing import MARKET_DATA_FRESH_SECONDS, SingleFlight
+from services.market_data import AsyncMarketDataProvider
+
+QUOTE_PERIOD = "5d"
+
+
+class QuoteCache:
+    # latest close per ticker; misses are fetched together in one batched download
+    def __init__(self, fresh_for: float = MARKET_DATA_FRESH_SECONDS):
+        self.fresh_for = fresh_for
+        self._quotes: Dict[str, tuple] = {}
+        # joins concurrent misses per ticker; freshness lives in _quotes, so quotes
+        # neither cache twice nor take room in the bar-series flight's LRU
+        self._flight = SingleFlight(fresh_for=0)
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    async def _download(self, tickers: List[str], market_data: AsyncMarketDataProvider) -> Dict[str, Optional[float]]:
+        self.batches += 1
+        frames = await market_data.fetch_many(list(tickers), interval="1d", period=QUOTE_PERIOD)
+        prices = dict.fromkeys(tickers)
+        for ticker, frame in frames.items():
+            closes = frame["Close"].dropna()
+            if len(closes):
+                prices[ticker] = float(closes.iloc[-1])
+        return prices
+
+    async def latest(self, tickers: List[str], market_data: AsyncMarketDataProvider) -> Dict[str, float]:
+        now = time.monotonic()
+        prices, missing = {}, []
+        for ticker in dict.fromkeys(tickers):
+            cached = self._quotes.get(ticker)
+            if cached is not None and cached[0] > now:
+                prices[ticker] = cached[1]
+            else:
+                missing.append(ticker)
+        self.hits += len(prices)
+        self.misses += len(missing)
+        if missing:
+            fetched = await self._flight.run_many(sorted(missing), self._download, market_data)
+            expires = time.monotonic() + self.fresh_for
+            for ticker, price in fetched.items():
+                if price is not None:
+                    self._quotes[ticker] = (expires, price)
+                    prices[ticker] = price
+        return prices
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._quotes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "coalesced": self._flight.coalesced,
+        }
+
+
+quote_cache = QuoteCache()
+
+
+def get_quote_cache() -> QuoteCache:
+    return quote_cache
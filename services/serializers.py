@@ -0,0 +1,158 @@
+from typing import Iterator, Optional
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi import HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+
+DAILY_DATE_FORMAT = "%Y-%m-%d"
+INTRADAY_DATE_FORMAT = "%Y-%m-%d %I:%M %p"
+# bars are stored as naive NSE wall-clock time
+EXCHANGE_TZ = "Asia/Kolkata"
+
+COLUMNS_MEDIA_TYPE = "application/vnd.bars.columns+json"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# u4 row count, then i8 epoch seconds, f8 close and i8 volume arrays, little-endian
+BINARY_LAYOUT = "count:<u4,t:<i8[count],close:<f8[count],volume:<i8[count]"
+BAR_FORMATS = {
+    "rows": "application/json",
+    "columns": COLUMNS_MEDIA_TYPE,
+    "binary": BINARY_MEDIA_TYPE,
+    "ndjson": NDJSON_MEDIA_TYPE,
+}
+STREAM_CHUNK_ROWS = 2000
+
+# " hh:MM AM" for every minute of the day, indexed by hour * 60 + minute
+_CLOCK_LABELS = np.array(
+    [
+        " %02d:%02d %s" % (hour % 12 or 12, minute, "AM" if hour < 12 else "PM")
+        for hour in range(24)
+        for minute in range(60)
+    ]
+)
+
+
+def format_dates(index: pd.DatetimeIndex, date_format: str) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if date_format == DAILY_DATE_FORMAT:
+        return index.values.astype("datetime64[D]").astype(str)
+    if date_format == INTRADAY_DATE_FORMAT:
+        days = index.values.astype("datetime64[D]").astype(str)
+        minute_of_day = index.hour.to_numpy() * 60 + index.minute.to_numpy()
+        return np.char.add(days, _CLOCK_LABELS[minute_of_day])
+    return index.strftime(date_format).to_numpy()
+
+
+def round_prices(values: np.ndarray, decimals: int = 3) -> np.ndarray:
+    # np.round scales by 10**decimals and can land on the wrong side of a tie
+    # (2.6745 -> 2.674); values that scale to within float error of a half are
+    # redone with round(), which rounds the exact binary value like the old rows did
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimals)
+    scaled = np.abs(values) * 10.0**decimals
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) <= np.maximum(1e-6, 4 * np.spacing(scaled))
+    if near_half.any():
+        rounded[near_half] = [round(value, decimals) for value in values[near_half].tolist()]
+    return rounded
+
+
+def bars_to_rows(df: pd.DataFrame, date_format: str) -> list:
+    dates = format_dates(df.index, date_format).tolist()
+    close = round_prices(df["Close"].to_numpy(dtype=float)).tolist()
+    volume = df["Volume"].to_numpy(dtype=np.int64).tolist()
+    return [
+        {"Date": date, "Close": price, "Volume": traded}
+        for date, price, traded in zip(dates, close, volume)
+    ]
+
+
+def epoch_seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize(EXCHANGE_TZ)
+    return index.as_unit("s").asi8
+
+
+def bars_to_columns(df: pd.DataFrame) -> dict:
+    return {
+        "t": epoch_seconds(df.index),
+        "close": round_prices(df["Close"].to_numpy(dtype=float)),
+        "volume": df["Volume"].to_numpy(dtype=np.int64),
+    }
+
+
+def bars_to_binary(df: pd.DataFrame) -> bytes:
+    columns = bars_to_columns(df)
+    return b"".join(
+        [
+            np.array([len(df)], dtype="<u4").tobytes(),
+            columns["t"].astype("<i8").tobytes(),
+            columns["close"].astype("<f8").tobytes(),
+            columns["volume"].astype("<i8").tobytes(),
+        ]
+    )
+
+
+def iter_json_rows(
+    df: pd.DataFrame, key: str, date_format: str, chunk_rows: int = STREAM_CHUNK_ROWS
+) -> Iterator[bytes]:
+    # same document as the row JSON, written a chunk of rows at a time
+    yield b'{"' + key.encode() + b'":['
+    for offset in range(0, len(df), chunk_rows):
+        rows = orjson.dumps(bars_to_rows(df.iloc[offset : offset + chunk_rows], date_format))
+        yield (b"," if offset else b"") + rows[1:-1]
+    yield b"]}"
+
+
+def iter_ndjson_rows(
+    df: pd.DataFrame, date_format: str, chunk_rows: int = STREAM_CHUNK_ROWS
+) -> Iterator[bytes]:
+    for offset in range(0, len(df), chunk_rows):
+        rows = bars_to_rows(df.iloc[offset : offset + chunk_rows], date_format)
+        yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+def bar_format(request: Request, format: Optional[str] = None) -> str:
+    # ?format= wins over the Accept header; anything unrecognised keeps the row JSON
+    if format is not None:
+        if format not in BAR_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Unsupported format, expected one of {sorted(BAR_FORMATS)}",
+            )
+        return format
+    accept = request.headers.get("accept", "")
+    if COLUMNS_MEDIA_TYPE in accept:
+        return "columns"
+    if BINARY_MEDIA_TYPE in accept:
+        return "binary"
+    if NDJSON_MEDIA_TYPE in accept:
+        return "ndjson"
+    return "rows"
+
+
+def bars_response(
+    df: pd.DataFrame,
+    key: str,
+    date_format: str,
+    format: str = "rows",
+    stream: bool = False,
+) -> Response:
+    headers = {"Vary": "Accept"}
+    if format == "ndjson":
+        return StreamingResponse(
+            iter_ndjson_rows(df, date_format), media_type=NDJSON_MEDIA_TYPE, headers=headers
+        )
+    if format == "columns":
+        return ORJSONResponse(
+            {key: bars_to_columns(df)}, media_type=COLUMNS_MEDIA_TYPE, headers=headers
+        )
+    if format == "binary":
+        headers["X-Bars-Layout"] = BINARY_LAYOUT
+        return Response(bars_to_binary(df), media_type=BINARY_MEDIA_TYPE, headers=headers)
+    if stream:
+        return StreamingResponse(
+            iter_json_rows(df, key, date_format), media_type="application/json", headers=headers
+        )
+    return ORJSONResponse({key: bars_to_rows(df, date_format)}, headers=headers)
@@ -0,0 +1,90 @@
+import hashlib
+import sys
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, List
+import orjson
+
+ROUTES_DIR = Path(__file__).resolve().parent.parent / "routes"
+SYMBOLS_XLSX = ROUTES_DIR / "symbols_results.xlsx"
+SYMBOLS_FILE = ROUTES_DIR / "symbols.txt"
+EXCHANGE_SUFFIX = ".NS"
+
+
+def to_ticker(symbol: str) -> str:
+    # ledger and route symbols are stored bare ("TCS"); yfinance wants "TCS.NS"
+    ticker = str(symbol).strip().upper()
+    if not ticker.endswith(EXCHANGE_SUFFIX):
+        ticker += EXCHANGE_SUFFIX
+    return ticker
+
+
+def compile_symbols(source: Path = SYMBOLS_XLSX, target: Path = SYMBOLS_FILE) -> int:
+    # one ticker per line, in the spreadsheet order which doubles as the search rank
+    import pandas as pd
+
+    symbols = pd.read_excel(source, sheet_name="Valid Symbols")["Valid Symbols"]
+    symbols = symbols.dropna().astype(str).str.strip().drop_duplicates().tolist()
+    target.write_text("\n".join(symbols) + "\n", encoding="utf-8")
+    return len(symbols)
+
+
+class SymbolRegistry:
+    def __init__(self, tickers: Iterable[str]):
+        self.tickers = tuple(tickers)
+        self.valid = frozenset(self.tickers)
+        self.names = [ticker.split(".")[0] for ticker in self.tickers]
+        ranked = sorted((name, rank) for rank, name in enumerate(self.names))
+        self._sorted_names = [name for name, _ in ranked]
+        self._sorted_ranks = [rank for _, rank in ranked]
+        self.names_body = orjson.dumps({"symbols": self.names})
+        self.names_etag = '"%s"' % hashlib.sha1(self.names_body).hexdigest()
+
+    @classmethod
+    def load(cls, path: Path = SYMBOLS_FILE) -> "SymbolRegistry":
+        lines = path.read_text(encoding="utf-8").splitlines()
+        return cls(line.strip() for line in lines if line.strip())
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.valid
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        query = query.strip().upper()
+        if not query:
+            return []
+        lower = bisect_left(self._sorted_names, query)
+        upper = bisect_left(self._sorted_names, query + "\uffff", lower)
+        # prefix hits first (exact match, then by listing rank), then substrings
+        prefix = sorted(
+            range(lower, upper),
+            key=lambda i: (self._sorted_names[i] != query, self._sorted_ranks[i]),
+        )
+        results = [self._sorted_names[i] for i in prefix[:limit]]
+        if len(results) < limit:
+            seen = set(results)
+            substring = sorted(
+                (name.find(query), rank, name)
+                for rank, name in enumerate(self.names)
+                if name not in seen and query in name
+            )
+            results.extend(name for _, _, name in substring[: limit - len(results)])
+        return results
+
+
+_symbol_registry = None
+
+
+def get_symbol_registry() -> SymbolRegistry:
+    global _symbol_registry
+    if _symbol_registry is None:
+        _symbol_registry = SymbolRegistry.load()
+    return _symbol_registry
+
+
+if __name__ == "__main__":
+    # python -m services.symbols  -> regenerate routes/symbols.txt from the xlsx
+    count = compile_symbols()
+    sys.stdout.write(f"wrote {count} symbols to {SYMBOLS_FILE}\n")
@@ -0,0 +1,274 @@
+import asyncio
+import io
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set, Tuple
+import numpy as np
+import orjson
+import pandas as pd
+from bson import ObjectId
+from fastapi import HTTPException, status
+from services.ledger import PositionLedger
+from services.symbols import EXCHANGE_SUFFIX, get_symbol_registry, to_ticker
+
+IMPORT_CHUNK_ROWS = 1000
+MAX_IMPORT_ROWS = 100_000
+# broker statements name the same columns differently
+COLUMN_ALIASES = {
+    "side": ["side", "type", "action", "trade_type", "buy/sell", "transaction_type"],
+    "symbol": ["symbol", "ticker", "scrip", "tradingsymbol", "stock"],
+    "name": ["name", "company", "company_name"],
+    "quantity": ["quantity", "qty", "shares", "units"],
+    "price": ["price", "price_per_unit", "price_per_unit_sold", "rate", "trade_price"],
+    "timestamp": ["timestamp", "date", "trade_date", "order_execution_time", "time"],
+}
+REQUIRED_COLUMNS = ["side", "symbol", "quantity", "price"]
+SIDES = {"buy": 1, "b": 1, "purchase": 1, "sell": -1, "s": -1, "sale": -1, "sold": -1}
+# imports still writing, referenced so a disconnect never lets one be collected
+_running: Set[asyncio.Task] = set()
+
+
+def read_statement(content: bytes, filename: str) -> pd.DataFrame:
+    suffix = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    try:
+        if suffix == "csv":
+            frame = pd.read_csv(io.BytesIO(content), dtype=str, skipinitialspace=True)
+        elif suffix in ("xlsx", "xlsm"):
+            frame = pd.read_excel(io.BytesIO(content), dtype=str, engine="openpyxl")
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Upload a .csv or .xlsx statement",
+            )
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Could not read statement: %s" % exc
+        )
+    if len(frame) > MAX_IMPORT_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="A statement can hold at most %d trades" % MAX_IMPORT_ROWS,
+        )
+    headers = {str(column).strip().lower().replace(" ", "_"): column for column in frame.columns}
+    renamed = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        found = next((headers[alias] for alias in aliases if alias in headers), None)
+        if found is not None:
+            renamed[found] = field
+    missing = [field for field in REQUIRED_COLUMNS if field not in renamed.values()]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Missing columns: %s" % ", ".join(missing),
+        )
+    frame = frame[list(renamed)].rename(columns=renamed)
+    for field in COLUMN_ALIASES:
+        if field not in frame:
+            frame[field] = None
+    # row numbers as the user sees them in the file, header being row 1
+    frame.index = pd.RangeIndex(2, len(frame) + 2, name="row")
+    return frame
+
+
+def _parse_timestamps(raw: pd.Series) -> pd.Series:
+    # ISO-8601 first so 2024-01-05 stays 5 January; only the rows it cannot read
+    # fall back to day-first broker formats such as 05/01/2024
+    parsed = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+    rest = parsed.isna() & raw.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(raw[rest], errors="coerce", format="mixed", dayfirst=True)
+    return parsed
+
+
+def _oversold_rows(trades: pd.DataFrame, held: pd.Series) -> list:
+    # whether a sale fits depends on which earlier sales were rejected, so this
+    # one check walks the trades in order over plain lists
+    holdings = held.to_dict()
+    oversold = []
+    for row, symbol, signed in zip(trades.index, trades["symbol"].tolist(), trades["signed"].tolist()):
+        remaining = holdings.get(symbol, 0) + signed
+        if remaining < 0:
+            oversold.append(row)
+        else:
+            holdings[symbol] = remaining
+    return oversold
+
+
+def validate_trades(
+    frame: pd.DataFrame, held: pd.Series, not_before: Optional[datetime] = None
+) -> Tuple[pd.DataFrame, List[dict]]:
+    # every check is a column-wide mask; messages are only built for failing rows.
+    # the ledger and P&L replay trades in insertion (_id) order, so a trade dated
+    # before `not_before` (the owner's latest recorded trade) would be replayed
+    # out of time order and is rejected
+    side = frame["side"].fillna("").str.strip().str.lower().map(SIDES)
+    symbol = frame["symbol"].fillna("").str.strip().str.upper()
+    symbol = symbol.where(~symbol.str.endswith(EXCHANGE_SUFFIX), symbol.str[: -len(EXCHANGE_SUFFIX)])
+    quantity = pd.to_numeric(frame["quantity"], errors="coerce")
+    price = pd.to_numeric(frame["price"], errors="coerce")
+    timestamp = _parse_timestamps(frame["timestamp"])
+    registry = get_symbol_registry()
+    listed = np.fromiter((to_ticker(s) in registry for s in symbol), dtype=bool, count=len(symbol))
+
+    checks = [
+        (side.isna(), "side must be buy or sell"),
+        (symbol.eq(""), "symbol is required"),
+        (symbol.ne("") & ~listed, "unknown symbol"),
+        (~(quantity > 0) | (quantity % 1 != 0), "quantity must be a positive whole number"),
+        (~(price > 0) | ~np.isfinite(price), "price must be a positive number"),
+        (frame["timestamp"].notna() & timestamp.isna(), "timestamp is not a date"),
+    ]
+    if not_before is not None:
+        checks.append((timestamp < pd.Timestamp(not_before), "dated before the latest recorded trade"))
+    failed = pd.DataFrame({message: mask for mask, message in checks}, index=frame.index)
+    bad = failed.any(axis=1)
+
+    trades = pd.DataFrame(
+        {
+            "side": side,
+            "symbol": symbol,
+            "name": frame["name"].where(frame["name"].notna(), None),
+            "quantity": quantity,
+            "price": price,
+            "timestamp": timestamp.fillna(pd.Timestamp(datetime.now())),
+        },
+        index=frame.index,
+    )[~bad]
+    # trades are applied in time order, file order breaking ties
+    trades = trades.sort_values("timestamp", kind="stable")
+    trades["quantity"] = trades["quantity"].astype(int)
+    trades["signed"] = trades["side"] * trades["quantity"]
+    oversold = _oversold_rows(trades, held)
+    trades = trades.drop(oversold)
+
+    errors = [
+        {"row": int(row), "errors": [message for message, flag in flags.items() if flag]}
+        for row, flags in failed[bad].iterrows()
+    ]
+    errors.extend({"row": int(row), "errors": ["Not enough stocks to sell"]} for row in oversold)
+    errors.sort(key=lambda error: error["row"])
+    return trades.drop(columns="signed"), errors
+
+
+async def latest_trade_time(ledger: PositionLedger, owner: str) -> Optional[datetime]:
+    found = await asyncio.gather(
+        *(
+            collection.find_one({"owner": owner}, {"_id": 0, "timestamp": 1}, sort=[("timestamp", -1)])
+            for collection in (ledger.purchases, ledger.solds)
+        )
+    )
+    times = [document["timestamp"] for document in found if document and document.get("timestamp")]
+    return max(times) if times else None
+
+
+def _documents(trades: pd.DataFrame, owner: str, now: datetime) -> Tuple[list, list]:
+    purchases, solds = [], []
+    for row in trades.itertuples(index=False):
+        # ids are taken in trade order so the ledger replays the import in sequence
+        if row.side > 0:
+            purchases.append(
+                {
+                    "_id": ObjectId(),
+                    "symbol": row.symbol,
+                    "name": row.name,
+                    "timestamp": row.timestamp.to_pydatetime(),
+                    "price_per_unit": float(row.price),
+                    "quantity": int(row.quantity),
+                    "created_at": now,
+                    "last_updated": now,
+                    "owner": owner,
+                }
+            )
+        else:
+            solds.append(
+                {
+                    "_id": ObjectId(),
+                    "symbol": row.symbol,
+                    "timestamp": row.timestamp.to_pydatetime(),
+                    "price_per_unit_sold": float(row.price),
+                    "quantity": int(row.quantity),
+                    "created_at": now,
+                    "last_modified_at": now,
+                    "owner": owner,
+                }
+            )
+    return purchases, solds
+
+
+async def _write(
+    ledger: PositionLedger,
+    owner: str,
+    purchases: list,
+    solds: list,
+    symbols: list,
+    progress: asyncio.Queue,
+) -> pd.DataFrame:
+    # puts the running insert count on `progress`, then None once it stops
+    written = 0
+    try:
+        for collection, documents in ((ledger.purchases, purchases), (ledger.solds, solds)):
+            for start in range(0, len(documents), IMPORT_CHUNK_ROWS):
+                chunk = documents[start : start + IMPORT_CHUNK_ROWS]
+                await collection.insert_many(chunk, ordered=False)
+                written += len(chunk)
+                progress.put_nowait(written)
+    finally:
+        # a failed chunk leaves the earlier ones in place, so positions are
+        # rebuilt whether or not every insert went through
+        try:
+            positions = await ledger.sync(owner, symbols)
+        finally:
+            progress.put_nowait(None)
+    return positions
+
+
+def _line(event: dict) -> bytes:
+    return orjson.dumps(event) + b"\n"
+
+
+async def run_import(
+    frame: pd.DataFrame,
+    owner: str,
+    ledger: PositionLedger,
+    dry_run: bool = False,
+) -> AsyncIterator[bytes]:
+    # NDJSON progress: one "validated" line, one per written chunk, then "done"
+    held = pd.Series(
+        {
+            position["symbol"]: position["quantity"]
+            async for position in ledger.positions.find({"owner": owner}, {"_id": 0, "symbol": 1, "quantity": 1})
+        },
+        dtype=float,
+    )
+    not_before = await latest_trade_time(ledger, owner)
+    # large statements take a moment to validate, keep that off the event loop
+    trades, errors = await asyncio.to_thread(validate_trades, frame, held, not_before)
+    yield _line(
+        {"stage": "validated", "rows": len(frame), "valid": len(trades), "errors": errors}
+    )
+    if dry_run or not len(trades):
+        yield _line({"stage": "done", "inserted": 0, "symbols": []})
+        return
+    purchases, solds = _documents(trades, owner, datetime.now())
+    symbols = sorted(trades["symbol"].unique())
+    progress: asyncio.Queue = asyncio.Queue()
+    # the writes run in their own task: a client hanging up cancels this generator,
+    # but trades already inserted must still reach current_stocks
+    task = asyncio.create_task(_write(ledger, owner, purchases, solds, symbols, progress))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    written = 0
+    while (done := await progress.get()) is not None:
+        written = done
+        yield _line({"stage": "inserted", "done": written, "total": len(trades)})
+    positions = await asyncio.shield(task)
+    yield _line(
+        {
+            "stage": "done",
+            "inserted": written,
+            "symbols": symbols,
+            "positions": [
+                {"symbol": row.symbol, "quantity": int(row.quantity), "price_per_unit": float(row.price_per_unit)}
+                for row in positions.itertuples(index=False)
+            ],
+        }
+    )
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+
+class AsyncCursor:
+    # the slice of pymongo's AsyncCursor the app uses, over a mongomock cursor
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    def skip(self, count):
+        self.cursor = self.cursor.skip(count)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    # every call yields to the loop first so concurrent requests really interleave
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline, **kwargs):
+        await asyncio.sleep(0)
+        return AsyncCursor(self.collection.aggregate(pipeline, **kwargs))
+
+    async def bulk_write(self, requests, ordered=True):
+        # mongomock's bulk API lags pymongo's operation classes; the app only
+        # sends UpdateOne, so apply them one at a time
+        await asyncio.sleep(0)
+        modified = upserted = 0
+        for request in requests:
+            result = self.collection.update_one(request._filter, request._doc, upsert=request._upsert)
+            modified += result.modified_count
+            upserted += result.upserted_id is not None
+        return SimpleNamespace(modified_count=modified, upserted_count=upserted)
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.database[name])
+
+
+@pytest.fixture
+def mongo():
+    mongomock = pytest.importorskip("mongomock")
+    return AsyncDatabase(mongomock.MongoClient().db)
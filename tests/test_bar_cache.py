@@ -0,0 +1,111 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from services.bar_cache import BarCache, MongoBarBackend, cached_series
+from services.bar_store import BarStore
+from services.coalescing import SingleFlight
+from services.market_data import AsyncMarketDataProvider, InMemoryProvider, MarketDataProvider
+
+SYMBOL = "TCS.NS"
+
+
+def daily(start: str, periods: int, close: float = 100.0) -> pd.DataFrame:
+    index = pd.date_range(start, periods=periods, freq="D", name="Date")
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close + np.arange(periods, dtype=float),
+            "Volume": np.arange(periods, dtype=np.int64) + 1,
+        },
+        index=index,
+    )
+
+
+@pytest.fixture(params=["mongo", "bar_store"])
+def backend(request, tmp_path):
+    if request.param == "bar_store":
+        return BarStore(str(tmp_path))
+    mongomock = pytest.importorskip("mongomock")
+    return MongoBarBackend(mongomock.MongoClient().db.stock_data)
+
+
+def assert_bars(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    assert list(actual.index) == list(expected.index)
+    for column in ["Open", "High", "Low", "Close", "Volume"]:
+        assert actual[column].tolist() == pytest.approx(expected[column].tolist())
+
+
+def test_provider_must_implement_fetch():
+    with pytest.raises(TypeError):
+        MarketDataProvider()
+
+
+def test_cold_fill_reads_through_the_provider(backend):
+    series = daily("2024-01-01", 30)
+    provider = InMemoryProvider({(SYMBOL, "1d"): series})
+    bars = BarCache(backend, provider).get_bars(SYMBOL)
+    assert_bars(bars, series)
+    assert_bars(backend.load(SYMBOL, "1d"), series)
+    assert provider.calls == [(SYMBOL, "1d", "1950-01-01", None, None)]
+
+
+def test_tail_append_only_fetches_new_bars(backend):
+    provider = InMemoryProvider({(SYMBOL, "1d"): daily("2024-01-01", 30)})
+    cache = BarCache(backend, provider)
+    cache.get_bars(SYMBOL)
+    grown = daily("2024-01-01", 35)
+    provider.frames[(SYMBOL, "1d")] = grown
+    bars = cache.get_bars(SYMBOL)
+    # the refetch starts at the day of the last stored bar
+    assert provider.calls[-1] == (SYMBOL, "1d", "2024-01-30", None, None)
+    assert_bars(bars, grown)
+    assert_bars(backend.load(SYMBOL, "1d"), grown)
+
+
+def test_unchanged_refresh_writes_nothing(backend, monkeypatch):
+    provider = InMemoryProvider({(SYMBOL, "1d"): daily("2024-01-01", 30)})
+    cache = BarCache(backend, provider)
+    cache.get_bars(SYMBOL)
+    saves = []
+    monkeypatch.setattr(backend, "save", lambda *args: saves.append(args))
+    bars = cache.get_bars(SYMBOL)
+    assert saves == []
+    assert_bars(bars, daily("2024-01-01", 30))
+
+
+def test_overlapping_tail_replaces_the_forming_bar(backend):
+    provider = InMemoryProvider({(SYMBOL, "1d"): daily("2024-01-01", 30)})
+    cache = BarCache(backend, provider)
+    cache.get_bars(SYMBOL)
+    # the last stored bar was still forming and closes differently, then two more arrive
+    revised = daily("2024-01-01", 32)
+    revised.loc[pd.Timestamp("2024-01-30"), "Close"] = 55.5
+    provider.frames[(SYMBOL, "1d")] = revised
+    bars = cache.get_bars(SYMBOL)
+    assert not bars.index.has_duplicates
+    assert_bars(bars, revised)
+    assert_bars(backend.load(SYMBOL, "1d"), revised)
+
+
+def test_cached_series_coalesces_concurrent_requests(backend):
+    series = daily("2024-01-01", 30)
+    provider = InMemoryProvider({(SYMBOL, "1d"): series})
+    cache = BarCache(backend, provider)
+    market_data = AsyncMarketDataProvider(max_workers=2)
+
+    async def burst():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            *(cached_series(SYMBOL, "1d", cache, market_data, flight) for _ in range(5))
+        )
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        market_data.shutdown()
+    assert len(provider.calls) == 1
+    for bars in results:
+        assert_bars(bars, series)
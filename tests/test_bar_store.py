@@ -0,0 +1,98 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from services import bar_store
+from services.bar_store import BarStore
+
+SYMBOL, INTERVAL = "TCS.NS", "1d"
+
+
+def daily(start: str, periods: int, close: float) -> pd.DataFrame:
+    index = pd.date_range(start, periods=periods, freq="D", name="Date")
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close,
+            "Low": close,
+            "Close": close + np.arange(periods, dtype=float),
+            "Volume": np.ones(periods, dtype=np.int64),
+        },
+        index=index,
+    )
+
+
+def merge(stored: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([stored[stored.index < fresh.index[0]], fresh])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path))
+
+
+def test_a_segment_starting_earlier_supersedes_every_part_before_it(store):
+    base = daily("2024-01-01", 30, 100.0)
+    store.save(SYMBOL, INTERVAL, base, base)
+    first = daily("2024-01-20", 15, 200.0)
+    bars = merge(base, first)
+    store.save(SYMBOL, INTERVAL, bars, first)
+    # a refetch that reaches back past the previous segment's start
+    second = daily("2024-01-10", 10, 300.0)
+    bars = merge(bars, second)
+    store.save(SYMBOL, INTERVAL, bars, second)
+
+    loaded = store.load(SYMBOL, INTERVAL)
+    assert loaded.index.is_monotonic_increasing and not loaded.index.has_duplicates
+    assert list(loaded.index) == list(bars.index)
+    assert loaded["Close"].tolist() == bars["Close"].tolist()
+
+
+def test_compaction_never_replaces_a_mapped_file(store):
+    base = daily("2024-01-01", 30, 100.0)
+    store.save(SYMBOL, INTERVAL, base, base)
+    fresh = daily("2024-01-30", 3, 500.0)
+    store.save(SYMBOL, INTERVAL, merge(base, fresh), fresh)
+    mapped = store.load(SYMBOL, INTERVAL)
+    before = mapped["Close"].tolist()
+
+    assert store.compact(SYMBOL, INTERVAL) == 32
+    directory = Path(store.root, INTERVAL, SYMBOL)
+    assert (directory / "CURRENT").read_text() == "2"
+    assert sorted(path.name for path in directory.iterdir()) == ["CURRENT", "base-00000002.npy"]
+    assert mapped["Close"].tolist() == before
+    assert store.load(SYMBOL, INTERVAL)["Close"].tolist() == before
+
+
+def test_files_a_reader_still_maps_are_removed_later(store, monkeypatch):
+    base = daily("2024-01-01", 30, 100.0)
+    store.save(SYMBOL, INTERVAL, base, base)
+    unlink = Path.unlink
+
+    def locked(path, *args, **kwargs):
+        # what Windows does while another handle maps the file
+        raise PermissionError(path)
+
+    monkeypatch.setattr(Path, "unlink", locked)
+    fresh = daily("2024-01-30", 5, 500.0)
+    bars = merge(base, fresh)
+    store.save(SYMBOL, INTERVAL, bars, bars)
+    directory = Path(store.root, INTERVAL, SYMBOL)
+    assert (directory / "base-00000001.npy").exists()
+    assert store.load(SYMBOL, INTERVAL)["Close"].tolist() == bars["Close"].tolist()
+
+    monkeypatch.setattr(Path, "unlink", unlink)
+    store.compact(SYMBOL, INTERVAL)
+    assert sorted(path.name for path in directory.iterdir()) == ["CURRENT", "base-00000003.npy"]
+
+
+def test_segments_are_folded_into_a_new_base_at_the_limit(store, monkeypatch):
+    monkeypatch.setattr(bar_store, "BAR_STORE_MAX_SEGMENTS", 3)
+    bars = daily("2024-01-01", 30, 100.0)
+    store.save(SYMBOL, INTERVAL, bars, bars)
+    for day in range(6):
+        fresh = daily(str(bars.index[-1].date()), 2, 100.0 + day)
+        bars = merge(bars, fresh)
+        store.save(SYMBOL, INTERVAL, bars, fresh)
+        assert len(store._files(SYMBOL, INTERVAL)) <= 3
+        assert store.load(SYMBOL, INTERVAL)["Close"].tolist() == bars["Close"].tolist()
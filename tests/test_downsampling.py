@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from services.downsampling import DownsampleCache, lttb_indices
+
+
+def walk(size: int, seed: int = 6) -> np.ndarray:
+    return np.cumsum(np.random.default_rng(seed).normal(size=size))
+
+
+@pytest.mark.parametrize("size, points", [(10, 3), (10, 9), (5000, 3), (20000, 10000), (100000, 777)])
+def test_picks_one_bar_per_bucket_in_order(size, points):
+    indices = lttb_indices(np.arange(size, dtype=float), walk(size), points)
+    assert len(indices) == points
+    assert indices[0] == 0 and indices[-1] == size - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_short_series_is_returned_whole():
+    assert lttb_indices(np.arange(5.0), walk(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_spikes_survive():
+    y = np.zeros(1000)
+    y[537], y[80] = 50.0, -30.0
+    indices = lttb_indices(np.arange(1000.0), y, 20)
+    assert {80, 537} <= set(indices.tolist())
+
+
+def test_missing_closes_still_give_every_bucket_a_bar():
+    y = walk(1000)
+    y[100:200] = np.nan
+    indices = lttb_indices(np.arange(1000.0), y, 50)
+    assert len(indices) == 50 and np.all(np.diff(indices) > 0)
+
+
+def test_cache_keys_on_the_last_bar():
+    index = pd.date_range("2024-01-01", periods=500, freq="D", name="Date")
+    df = pd.DataFrame({"Close": walk(500)}, index=index)
+    cache = DownsampleCache()
+    reduced = cache.get("TCS", df, 50)
+    assert len(reduced) == 50 and cache.get("TCS", df, 50) is reduced
+    grown = pd.concat([df, pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2025-06-01"], name="Date"))])
+    assert cache.get("TCS", grown, 50).index[-1] == grown.index[-1]
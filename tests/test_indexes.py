@@ -0,0 +1,18 @@
+import asyncio
+import pytest
+from pymongo.errors import DuplicateKeyError
+from database.indexes import INDEXES, ensure_indexes
+
+
+def test_indexes_are_created(mongo):
+    asyncio.run(ensure_indexes(mongo))
+    for name, indexes in INDEXES.items():
+        created = mongo[name].collection.index_information()
+        assert {options["name"] for _, options in indexes} <= set(created)
+
+
+def test_duplicate_emails_stop_startup(mongo):
+    users = mongo["users"].collection
+    users.insert_many([{"email": "twice@example.com"}, {"email": "twice@example.com"}])
+    with pytest.raises(DuplicateKeyError):
+        asyncio.run(ensure_indexes(mongo))
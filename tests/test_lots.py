@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from services.lots import PnlEngine
+
+OWNER = "lots@example.com"
+
+
+def test_books_catch_up_and_rebuild_on_revision(mongo):
+    purchases, solds, revisions = mongo["buyed_stocks"], mongo["sold_stocks"], mongo["trade_revisions"]
+    engine, other_worker = PnlEngine(), PnlEngine()
+
+    async def realized():
+        pnl = await engine.get(OWNER, "fifo", purchases, solds, revisions)
+        return pnl.realized["TCS"]
+
+    async def scenario():
+        await purchases.insert_one({"owner": OWNER, "symbol": "TCS", "quantity": 10, "price_per_unit": 100.0})
+        await solds.insert_one({"owner": OWNER, "symbol": "TCS", "quantity": 4, "price_per_unit_sold": 110.0})
+        first = await realized()
+        # a trade written by another worker is picked up by the catch-up read
+        await solds.insert_one({"owner": OWNER, "symbol": "TCS", "quantity": 2, "price_per_unit_sold": 120.0})
+        second = await realized()
+        # an edit elsewhere bumps the shared revision, so this worker replays
+        await purchases.update_one({"owner": OWNER}, {"$set": {"price_per_unit": 90.0}})
+        await other_worker.forget(OWNER, revisions)
+        third = await realized()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == pytest.approx(4 * 10)
+    assert second == pytest.approx(4 * 10 + 2 * 20)
+    assert third == pytest.approx(4 * 20 + 2 * 30)
+    assert engine.stats() == {"owners": 1, "applied": 6, "rebuilds": 2}
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from auth.auth import get_current_user
+from database.database import get_expense_collection
+from routes.expense import router
+from services.pagination import NEXT_CURSOR_HEADER
+
+OWNER = "pages@example.com"
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def client(mongo):
+    expenses = mongo["expenses"]
+    documents = [
+        {
+            "owner": OWNER, "amount": float(i), "description": "dated", "split_amount": ["a", "b"],
+            "created_at": START + timedelta(days=i // 2), "last_modified": START + timedelta(days=i),
+        }
+        for i in range(6)
+    ]
+    # legacy rows written before created_at existed
+    documents.append({"owner": OWNER, "amount": 6.0, "description": "missing"})
+    documents.append({"owner": OWNER, "amount": 7.0, "description": "null", "created_at": None})
+    expenses.collection.insert_many(documents)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: OWNER
+    app.dependency_overrides[get_expense_collection] = lambda: expenses
+    return TestClient(app)
+
+
+def walk(client, **params) -> list:
+    amounts, after = [], None
+    while True:
+        response = client.get("/expenses", params={**params, **({"after": after} if after else {})})
+        assert response.status_code == 200
+        amounts.extend(row["amount"] for row in response.json())
+        after = response.headers.get(NEXT_CURSOR_HEADER)
+        if after is None:
+            return amounts
+
+
+def test_lists_keep_their_full_shape_by_default(client):
+    row = client.get("/expenses", params={"order": "desc", "limit": 1}).json()[0]
+    assert row["created_at"] == "2024-01-03T00:00:00"
+    assert row["last_modified"] == "2024-01-06T00:00:00"
+    assert row["split_amount"] == ["a", "b"]
+    row = client.get("/expenses", params={"order": "desc", "limit": 1, "fields": "amount"}).json()[0]
+    assert set(row) == {"id", "amount"}
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_undated_rows_come_first_ascending(client, limit):
+    assert walk(client, limit=limit) == [6.0, 7.0, 0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_undated_rows_come_last_descending(client, limit):
+    assert walk(client, limit=limit, order="desc") == [5.0, 4.0, 3.0, 2.0, 1.0, 0.0, 7.0, 6.0]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_streamed_pages_keep_undated_rows(client, order, limit):
+    expected = walk(client, order=order)
+    streamed = walk(client, order=order, limit=limit, stream="true")
+    assert streamed == expected
+    # the NDJSON body ends exactly where the next cursor picks up
+    response = client.get("/expenses", params={"order": order, "limit": 1}, headers={"Accept": "application/x-ndjson"})
+    assert len(response.text.splitlines()) == 1
+    assert response.headers[NEXT_CURSOR_HEADER]
@@ -0,0 +1,104 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from auth.auth import get_current_user
+from database.database import get_current_stocks_collection
+from routes.portfolio import router
+from services.market_data import AsyncMarketDataProvider, InMemoryProvider, get_async_market_data
+from services.quotes import QuoteCache, get_quote_cache
+
+OWNER = "valuation@example.com"
+
+
+def closes(last: float) -> pd.DataFrame:
+    index = pd.date_range("2024-03-01", periods=5, freq="D", name="Date")
+    close = np.linspace(last - 4, last, 5)
+    return pd.DataFrame(
+        {"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1}, index=index
+    )
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = InMemoryProvider({("TCS.NS", "1d"): closes(120.0), ("INFY.NS", "1d"): closes(50.0)})
+    monkeypatch.setattr("services.market_data._provider", provider)
+    return provider
+
+
+@pytest.fixture
+def client(mongo, provider):
+    holdings = mongo["current_stocks"]
+    holdings.collection.insert_many(
+        [
+            {"owner": OWNER, "symbol": "TCS", "name": "Tata", "quantity": 10, "price_per_unit": 100.0},
+            {"owner": OWNER, "symbol": "INFY", "name": "Infosys", "quantity": 4, "price_per_unit": 60.0},
+            # not a listed ticker, so it stays unpriced
+            {"owner": OWNER, "symbol": "NOPE123", "name": None, "quantity": 3, "price_per_unit": 10.0},
+            {"owner": OWNER, "symbol": "SOLD", "name": None, "quantity": 0, "price_per_unit": 10.0},
+            {"owner": "someone@example.com", "symbol": "TCS", "name": "Tata", "quantity": 99, "price_per_unit": 1.0},
+        ]
+    )
+    market_data = AsyncMarketDataProvider(max_workers=2)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: OWNER
+    app.dependency_overrides[get_current_stocks_collection] = lambda: holdings
+    app.dependency_overrides[get_quote_cache] = QuoteCache
+    app.dependency_overrides[get_async_market_data] = lambda: market_data
+    yield TestClient(app)
+    market_data.shutdown()
+
+
+def test_valuation_math(client, provider):
+    body = client.get("/api/portfolio/valuation").json()
+    rows = {row["symbol"]: row for row in body["holdings"]}
+    assert set(rows) == {"TCS", "INFY", "NOPE123"}
+
+    tcs, infy, unpriced = rows["TCS"], rows["INFY"], rows["NOPE123"]
+    assert tcs["last_price"] == 120.0
+    assert tcs["market_value"] == 1200.0
+    assert tcs["cost_basis"] == 1000.0
+    assert tcs["unrealized_pnl"] == 200.0
+    assert tcs["unrealized_pnl_pct"] == 20.0
+    assert infy["market_value"] == 200.0
+    assert infy["unrealized_pnl"] == -40.0
+    assert infy["unrealized_pnl_pct"] == pytest.approx(-16.67)
+    assert tcs["weight"] == pytest.approx(1200 / 1400, abs=1e-6)
+    assert infy["weight"] == pytest.approx(200 / 1400, abs=1e-6)
+    assert unpriced["last_price"] is None
+    assert unpriced["market_value"] is None
+
+    totals = body["totals"]
+    assert totals["market_value"] == 1400.0
+    # cost and P&L only count priced holdings
+    assert totals["cost_basis"] == 1240.0
+    assert totals["unrealized_pnl"] == 160.0
+    assert totals["unrealized_pnl_pct"] == pytest.approx(12.9)
+    assert totals["unpriced_symbols"] == ["NOPE123"]
+    # one fetch per listed ticker; the unlisted symbol is never requested
+    assert sorted(call[0] for call in provider.calls) == ["INFY.NS", "TCS.NS"]
+
+
+def test_concurrent_quote_misses_share_a_download(provider):
+    quotes = QuoteCache()
+    market_data = AsyncMarketDataProvider(max_workers=2)
+
+    async def burst():
+        return await asyncio.gather(
+            quotes.latest(["TCS.NS", "INFY.NS"], market_data),
+            quotes.latest(["TCS.NS"], market_data),
+            quotes.latest(["INFY.NS", "TCS.NS"], market_data),
+        )
+
+    try:
+        results = asyncio.run(burst())
+        again = asyncio.run(quotes.latest(["TCS.NS"], market_data))
+    finally:
+        market_data.shutdown()
+    assert results == [{"TCS.NS": 120.0, "INFY.NS": 50.0}, {"TCS.NS": 120.0}, {"INFY.NS": 50.0, "TCS.NS": 120.0}]
+    assert again == {"TCS.NS": 120.0}
+    assert quotes.batches == 1
+    assert quotes.stats()["hits"] == 1
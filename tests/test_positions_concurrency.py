@@ -0,0 +1,68 @@
+import asyncio
+import random
+import pytest
+from fastapi import HTTPException
+from services.positions import apply_buy, apply_sell
+
+OWNER = "burst@example.com"
+SYMBOL = "TCS"
+TRADES = 200
+
+
+@pytest.fixture
+def positions(mongo):
+    collection = mongo["current_stocks"]
+    collection.collection.create_index([("owner", 1), ("symbol", 1)], unique=True)
+    return collection
+
+
+async def _sell(positions, quantity: int, price: float):
+    try:
+        await apply_sell(positions, OWNER, SYMBOL, quantity, price)
+        return quantity
+    except HTTPException as error:
+        assert error.status_code == 400
+        return 0
+
+
+def test_concurrent_buys_keep_every_trade(positions):
+    rng = random.Random(15)
+    buys = [(rng.randint(1, 50), round(rng.uniform(100, 200), 2)) for _ in range(TRADES)]
+
+    async def burst():
+        await asyncio.gather(
+            *(apply_buy(positions, OWNER, SYMBOL, "Tata", quantity, price) for quantity, price in buys)
+        )
+
+    asyncio.run(burst())
+    documents = list(positions.collection.find({"owner": OWNER, "symbol": SYMBOL}))
+    assert len(documents) == 1
+    quantity = sum(q for q, _ in buys)
+    cost = sum(q * p for q, p in buys)
+    assert documents[0]["quantity"] == quantity
+    assert documents[0]["price_per_unit"] == pytest.approx(cost / quantity)
+    assert documents[0]["net_profit"] == pytest.approx(-cost)
+
+
+def test_concurrent_sells_never_oversell(positions):
+    rng = random.Random(16)
+    held = 1000
+    asyncio.run(apply_buy(positions, OWNER, SYMBOL, "Tata", held, 100.0))
+    # asks for about twice what is held, so some sells have to be refused
+    sells = [(rng.randint(1, 20), round(rng.uniform(90, 130), 2)) for _ in range(TRADES)]
+
+    async def burst():
+        return await asyncio.gather(*(_sell(positions, quantity, price) for quantity, price in sells))
+
+    sold = asyncio.run(burst())
+    position = positions.collection.find_one({"owner": OWNER, "symbol": SYMBOL})
+    assert 0 < sum(sold) <= held
+    assert position["quantity"] == held - sum(sold)
+    proceeds = sum(q * p for (q, p), applied in zip(sells, sold) if applied)
+    assert position["net_profit"] == pytest.approx(proceeds - held * 100.0)
+
+
+def test_sell_without_position_is_not_found(positions):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(apply_sell(positions, OWNER, SYMBOL, 1, 100.0))
+    assert error.value.status_code == 404
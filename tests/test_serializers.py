@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from services.serializers import (
+    DAILY_DATE_FORMAT,
+    INTRADAY_DATE_FORMAT,
+    bars_to_columns,
+    bars_to_rows,
+    round_prices,
+)
+
+
+def test_rows_round_like_python_round():
+    # ties that np.round alone gets wrong, plus 4-decimal ticks
+    closes = np.r_[[2.6745, 123.4565, -2.6745, 0.0015, 1.0005], np.round(np.random.default_rng(2).uniform(0, 5000, 5000), 4)]
+    index = pd.date_range("2024-01-01 09:15", periods=len(closes), freq="5min", name="Date")
+    df = pd.DataFrame({"Close": closes, "Volume": np.arange(len(closes))}, index=index)
+    rows = bars_to_rows(df, INTRADAY_DATE_FORMAT)
+    assert [row["Close"] for row in rows] == [round(float(close), 3) for close in closes]
+    assert rows[0] == {"Date": "2024-01-01 09:15 AM", "Close": 2.675, "Volume": 0}
+    assert bars_to_columns(df)["close"].tolist() == [row["Close"] for row in rows]
+
+
+def test_missing_closes_stay_missing():
+    assert np.isnan(round_prices(np.array([np.nan]))[0])
+    df = pd.DataFrame({"Close": [1.23456], "Volume": [5]}, index=pd.DatetimeIndex(["2024-03-01"], name="Date"))
+    assert bars_to_rows(df, DAILY_DATE_FORMAT) == [{"Date": "2024-03-01", "Close": 1.235, "Volume": 5}]
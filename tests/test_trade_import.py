@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+import orjson
+import pytest
+from services.ledger import PositionLedger
+from services.lots import PnlEngine
+from services.trade_import import read_statement, run_import
+
+OWNER = "import@example.com"
+
+
+@pytest.fixture
+def ledger(mongo):
+    return PositionLedger(
+        mongo["buyed_stocks"], mongo["sold_stocks"], mongo["current_stocks"], mongo["position_snapshots"]
+    )
+
+
+def statement(*rows: str) -> bytes:
+    return "\n".join(("side,symbol,quantity,price,date",) + rows).encode()
+
+
+def run(ledger, content: bytes) -> list:
+    async def collect():
+        frame = read_statement(content, "statement.csv")
+        return [orjson.loads(line) async for line in run_import(frame, OWNER, ledger)]
+
+    return asyncio.run(collect())
+
+
+def realized(ledger, revisions) -> float:
+    async def get():
+        return await PnlEngine().get(OWNER, "fifo", ledger.purchases, ledger.solds, revisions)
+
+    return asyncio.run(get()).realized["TCS"]
+
+
+def test_first_import_replays_in_time_order(ledger, mongo):
+    # file order is not time order; the sell must match the 2024-01-01 lot
+    events = run(
+        ledger,
+        statement(
+            "sell,TCS,5,120,2024-01-03",
+            "buy,TCS,10,100,2024-01-02",
+            "buy,TCS,10,50,2024-01-01",
+        ),
+    )
+    assert events[0]["errors"] == []
+    assert events[-1]["positions"][0]["quantity"] == 15
+    assert realized(ledger, mongo["trade_revisions"]) == pytest.approx(5 * (120 - 50))
+
+
+def test_back_dated_import_is_rejected(ledger, mongo):
+    ledger.purchases.collection.insert_one(
+        {"owner": OWNER, "symbol": "TCS", "quantity": 10, "price_per_unit": 100.0, "timestamp": datetime(2024, 3, 1)}
+    )
+    ledger.positions.collection.insert_one(
+        {"owner": OWNER, "symbol": "TCS", "quantity": 10, "price_per_unit": 100.0, "net_profit": -1000.0}
+    )
+    events = run(
+        ledger,
+        statement(
+            "buy,TCS,10,50,2024-01-01",
+            "sell,TCS,5,120,2024-03-01",
+            "sell,TCS,5,130,2024-04-01",
+        ),
+    )
+    assert events[0]["valid"] == 2
+    assert events[0]["errors"] == [{"row": 2, "errors": ["dated before the latest recorded trade"]}]
+    assert ledger.purchases.collection.count_documents({"owner": OWNER}) == 1
+    assert events[-1]["positions"][0]["quantity"] == 0
+    # only the stored 100 lot exists, so nothing was matched against the rejected 50 buy
+    assert realized(ledger, mongo["trade_revisions"]) == pytest.approx(5 * 20 + 5 * 30)